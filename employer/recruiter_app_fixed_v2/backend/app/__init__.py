@@ -4,9 +4,9 @@ Main application file for the Recruiter Application
 from flask import Flask, render_template, send_from_directory
 from flask_cors import CORS
 import os
-from .routes.api import api
-from .database.db import get_db_session, close_db_session
-from .models.models import Applicant, Skill, Certification, JobPosition, JobRequirement
+from ..routes.api import api
+from ..database.db import get_db_session, close_db_session
+from ..models.models import Applicant, Skill, Certification, JobPosition, JobRequirement
 import json
 
 def create_app():
@@ -0,0 +1,107 @@
+"""
+Admission control for match computations: a per-process budget of cost units with a bounded queue
+"""
+import collections
+import math
+import os
+import threading
+import time
+
+# Cost units of match computations allowed to run at once in one application worker process
+ADMISSION_CAPACITY = int(os.getenv('MATCH_ADMISSION_CAPACITY', '4'))
+
+# Match requests allowed to wait for capacity at once; further ones are turned away immediately
+ADMISSION_QUEUE = int(os.getenv('MATCH_ADMISSION_QUEUE', '2'))
+
+# Seconds a match request waits for capacity before it is turned away
+ADMISSION_WAIT = float(os.getenv('MATCH_ADMISSION_WAIT', '10'))
+
+class Overloaded(Exception):
+    """Raised when a match request is not admitted; retry_after is the number of seconds to wait before retrying"""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many match requests in progress, try again later")
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Weighted semaphore admitting requests in arrival order while their cost fits the capacity
+
+    A request costing more than the whole capacity is admitted alone. Waiting
+    requests are served first come, first served, so a costly request is not
+    starved by a stream of cheap ones.
+    """
+
+    def __init__(self, capacity, max_queue, max_wait):
+        self.capacity = max(capacity, 1)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_use = 0
+        self._waiting = collections.deque()
+        self._condition = threading.Condition()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def retry_after(self):
+        """Seconds a turned away request is asked to wait before retrying"""
+        return max(1, math.ceil(self.max_wait))
+
+    def acquire(self, cost):
+        """Take cost units, waiting up to max_wait seconds for them; return the units taken
+
+        Raises Overloaded when the queue is full or the wait runs out.
+        """
+        cost = min(cost, self.capacity)
+        with self._condition:
+            if not self._waiting and self.in_use + cost <= self.capacity:
+                self.in_use += cost
+                self.admitted += 1
+                return cost
+            if len(self._waiting) >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(self.retry_after)
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self.queued += 1
+            started = time.monotonic()
+            try:
+                while self._waiting[0] is not ticket or self.in_use + cost > self.capacity:
+                    remaining = started + self.max_wait - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise Overloaded(self.retry_after)
+                    self._condition.wait(remaining)
+                self.in_use += cost
+                self.admitted += 1
+                return cost
+            finally:
+                self.wait_seconds += time.monotonic() - started
+                self._waiting.remove(ticket)
+                # The next request in line may fit now, or may be at the head now
+                self._condition.notify_all()
+
+    def release(self, cost):
+        """Return units taken by acquire"""
+        with self._condition:
+            self.in_use -= cost
+            self._condition.notify_all()
+
+    def stats(self):
+        """Current load and counters of admitted, queued and turned away requests"""
+        with self._condition:
+            return {
+                "capacity": self.capacity,
+                "inUse": self.in_use,
+                "waiting": len(self._waiting),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "averageWaitSeconds": round(self.wait_seconds / self.queued, 4) if self.queued else 0.0,
+            }
+
+# Match computations of this process
+match_admission = AdmissionController(ADMISSION_CAPACITY, ADMISSION_QUEUE, ADMISSION_WAIT)
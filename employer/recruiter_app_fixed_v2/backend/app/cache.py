@@ -0,0 +1,184 @@
+"""
+In-process caches for match results
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+def array_bytes(value):
+    """Bytes held by the NumPy arrays in value, looking into dicts, lists and tuples"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(array_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(array_bytes(item) for item in value)
+    return 0
+
+class ResultCache:
+    """Thread-safe LRU cache with a time-to-live and hit/miss counters
+
+    Bounded by max_entries or, with max_bytes set, by the total weight of the
+    values as measured by weigh (max_entries may then be None).
+    """
+
+    def __init__(self, max_entries=128, ttl=300, max_bytes=None, weigh=array_bytes):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._weigh = weigh
+        self._entries = OrderedDict()  # key -> (expires_at, value, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        # Bumped on every invalidation so results computed from older data are not stored
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        """Store a value, unless the cache was invalidated since generation was read"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            size = self._weigh(value) if self.max_bytes is not None else 0
+            replaced = self._entries.pop(key, None)
+            if replaced is not None:
+                self._bytes -= replaced[2]
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                self._bytes -= self._entries.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.generation += 1
+
+    def stats(self):
+        """Counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class _Flight:
+    """One in-flight call of a SingleFlight"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Runs one call per key at a time; identical calls made meanwhile wait for it and share its result
+
+    An exception raised by the call is raised in every caller that waited for it.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> _Flight
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        """Return function(), or the result of the call already running for key"""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """Counters of the calls made and of those that shared another call's result"""
+        with self._lock:
+            return {
+                "inFlight": len(self._flights),
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "coalescedRate": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+            }
+
+# Scored results of ad-hoc requirement searches, keyed by canonical requirements
+requirements_cache = ResultCache(
+    max_entries=int(os.getenv('MATCH_CACHE_SIZE', '128')),
+    ttl=float(os.getenv('MATCH_CACHE_TTL', '300'))
+)
+
+# Per-criterion score components of recent search sessions, keyed by session id. Their
+# size grows with the applicant pool, so they are bounded by bytes rather than by count
+search_sessions = ResultCache(
+    max_entries=None,
+    ttl=float(os.getenv('MATCH_SESSION_TTL', '1800')),
+    max_bytes=int(os.getenv('MATCH_SESSION_CACHE_BYTES', str(64 * 1024 * 1024)))
+)
+
+# Scoring of identical ad-hoc searches running at the same time, keyed by cache key and index version
+requirement_flights = SingleFlight()
+
+# Refreshes of the stored matches of a job position, keyed by job id
+job_match_flights = SingleFlight()
@@ -0,0 +1,102 @@
+"""
+Must-have requirement criteria compiled into SQL filters on applicants
+"""
+import json
+from sqlalchemy import exists, or_, select
+from ..models.models import Applicant, Skill, Certification, applicant_skill, applicant_certification
+from .index import EDUCATION_LEVELS, education_rank
+
+# Criteria of a requirements dictionary that can be listed under "mustHave"
+MUST_HAVE_CRITERIA = (
+    'educationLevel', 'experienceYears', 'maxSalary',
+    'requiredSkills', 'requiredCertifications', 'relocationRequired'
+)
+
+# Must-have criteria compared as numbers in SQL
+NUMERIC_CRITERIA = ('experienceYears', 'maxSalary')
+
+# Must-have criteria naming skills or certifications every applicant must hold
+NAME_LIST_CRITERIA = ('requiredSkills', 'requiredCertifications')
+
+def _must_have(requirements):
+    """Validated list of must-have criteria of a requirements dictionary"""
+    must_have = requirements.get('mustHave') or []
+    if not isinstance(must_have, list):
+        raise ValueError("mustHave must be a list of criteria")
+    for criterion in must_have:
+        if criterion not in MUST_HAVE_CRITERIA:
+            raise ValueError(f"Unknown mustHave criterion: {criterion}")
+        if requirements.get(criterion) in (None, '', []):
+            raise ValueError(f"mustHave criterion {criterion} has no value in the requirements")
+        value = requirements[criterion]
+        if criterion in NUMERIC_CRITERIA and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f"mustHave criterion {criterion} must be a number")
+        if criterion in NAME_LIST_CRITERIA and (
+                not isinstance(value, list) or not all(isinstance(name, str) for name in value)):
+            raise ValueError(f"mustHave criterion {criterion} must be a list of names")
+    return sorted(set(must_have))
+
+def must_have_clauses(requirements):
+    """Compile the must-have criteria of a requirements dictionary into WHERE clauses on applicants
+
+    Raises ValueError for unknown criteria, criteria without a value, non-numeric
+    experience and salary values and skills or certifications not given as a
+    list of names. Criteria
+    every applicant meets (an unknown education level, zero years of experience,
+    relocation not required) produce no clause.
+    """
+    clauses = []
+    for criterion in _must_have(requirements):
+        value = requirements[criterion]
+
+        if criterion == 'educationLevel':
+            # Same ordering as scoring: the required level or any higher one
+            required_rank = education_rank(value)
+            if required_rank != -1:
+                clauses.append(Applicant.education_level.in_(EDUCATION_LEVELS[required_rank:]))
+
+        elif criterion == 'experienceYears':
+            # Missing experience counts as zero years
+            if value > 0:
+                clauses.append(Applicant.experience_years >= value)
+
+        elif criterion == 'maxSalary':
+            # Applicants without a salary expectation are not known to exceed the ceiling
+            clauses.append(or_(Applicant.desired_salary.is_(None), Applicant.desired_salary <= value))
+
+        elif criterion == 'requiredSkills':
+            for name in set(value):
+                clauses.append(exists().where(
+                    applicant_skill.c.applicant_id == Applicant.id,
+                    applicant_skill.c.skill_id == Skill.id,
+                    Skill.name == name
+                ))
+
+        elif criterion == 'requiredCertifications':
+            for name in set(value):
+                clauses.append(exists().where(
+                    applicant_certification.c.applicant_id == Applicant.id,
+                    applicant_certification.c.certification_id == Certification.id,
+                    Certification.name == name
+                ))
+
+        elif criterion == 'relocationRequired':
+            if value:
+                clauses.append(Applicant.willing_to_relocate.is_(True))
+
+    return clauses
+
+def must_have_key(requirements):
+    """Canonical form of the must-have criteria, for cache keys (None without must-haves)"""
+    must_have = _must_have(requirements)
+    if not must_have:
+        return None
+    canonical = {
+        criterion: sorted(set(requirements[criterion])) if isinstance(requirements[criterion], list) else requirements[criterion]
+        for criterion in must_have
+    }
+    return json.dumps(canonical, sort_keys=True)
+
+def qualifying_applicant_ids(session, clauses):
+    """Ids of the applicants meeting every clause, in id order"""
+    return [applicant_id for (applicant_id,) in session.execute(select(Applicant.id).where(*clauses).order_by(Applicant.id))]
@@ -0,0 +1,630 @@
+"""
+Columnar in-memory applicant index used for vectorized match scoring
+"""
+import itertools
+import os
+import threading
+import numpy as np
+from sqlalchemy import func, select
+from ..models.models import Applicant, Skill, Certification, applicant_skill, applicant_certification
+from .records import load_applicant_records
+
+# Source of ApplicantIndex.version values, unique across rebuilds
+_versions = itertools.count(1)
+
+# Rows fetched at a time when the index reads whole tables
+SCAN_CHUNK_SIZE = int(os.getenv('MATCH_SCAN_CHUNK_SIZE', '10000'))
+
+def scan_rows(session, query):
+    """Yield the rows of query in lists of up to SCAN_CHUNK_SIZE rows
+
+    Rows are streamed (through a server-side cursor on PostgreSQL) rather than
+    fetched all at once, so only one chunk is held in memory at a time.
+    """
+    result = session.execute(query.execution_options(yield_per=SCAN_CHUNK_SIZE))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+def int_array(rows, width):
+    """Pack a chunk of rows of width integer columns into an int64 array of shape (len(rows), width)"""
+    return np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=len(rows) * width).reshape(-1, width)
+
+EDUCATION_LEVELS = ['High School', 'Associate\'s', 'Bachelor\'s', 'Master\'s', 'PhD']
+
+def education_rank(education_level):
+    """Position of an education level in EDUCATION_LEVELS, or -1 when unknown"""
+    return EDUCATION_LEVELS.index(education_level) if education_level in EDUCATION_LEVELS else -1
+
+# Scored criteria, in the order their points are added up
+COMPONENTS = (
+    'education', 'experience', 'required_skills', 'preferred_skills',
+    'certifications', 'location', 'salary'
+)
+
+# Criteria scored by the share of the plan's names an applicant holds: name -> (points, names in a plan)
+_SHARE_CRITERIA = {
+    'required_skills': (30, lambda plan: len(plan.required_skill_names)),
+    'preferred_skills': (10, lambda plan: len(plan.preferred_skill_names)),
+    'certifications': (10, lambda plan: plan.required_cert_count),
+}
+
+# Criteria whose results search sessions keep between searches (see compact_components). The
+# points of the others are arithmetic on index columns, about as quick to recompute as to add up
+SESSION_COMPONENTS = ('education', 'required_skills', 'preferred_skills', 'certifications', 'location')
+
+def share_points(plan, name, matched):
+    """Points of a share criterion for the numbers of the plan's names the applicants hold"""
+    points, names = _SHARE_CRITERIA[name]
+    return points * (matched / names(plan))
+
+def compact_components(components):
+    """Results of score_components(..., counts=True) in the smallest unsigned dtype holding them
+
+    They are all small integers (whole points or counts of names), so the
+    conversion is exact and expand_components restores the very same points.
+    """
+    return {
+        name: values if values is None else values.astype(np.min_scalar_type(int(values.max(initial=0))))
+        for name, values in components.items()
+    }
+
+def expand_components(plan, components):
+    """Points of the compact results of compact_components"""
+    return {
+        name: share_points(plan, name, values) if name in _SHARE_CRITERIA and values is not None else values
+        for name, values in components.items()
+    }
+
+def combine_components(plan, components, n):
+    """Add up per-criterion points (see ApplicantIndex.score_components) into percentages
+
+    The points are added in COMPONENTS order, as RequirementPlan.score does, so
+    the rounded percentages are identical however the components were obtained.
+    """
+    score = np.zeros(n, dtype=np.float64)
+    for name in COMPONENTS:
+        if components.get(name) is not None:
+            score += components[name]
+
+    # Calculate final percentage
+    if plan.max_score == 0:
+        return np.zeros(n, dtype=np.int64)
+    return np.rint((score / plan.max_score) * 100).astype(np.int64)
+
+class _Membership:
+    """Applicant x catalog membership for skills or certifications
+
+    Keeps a boolean matrix for counting matches and inverted posting lists
+    (catalog id -> index rows) for candidate generation. Buffers grow by
+    doubling so applicants and catalog entries can be appended cheaply.
+    """
+
+    def __init__(self, catalog, link_chunks, lookup, n_rows):
+        """Build from (catalog id, name) pairs and chunks of (applicant id, catalog id) links
+
+        lookup maps an array of applicant ids to their index rows and a mask of
+        the ids that are indexed. Each chunk of links is applied to the matrix
+        at once and only leaves its (column, row) keys behind for the postings.
+        """
+        self.ids = {}          # name -> catalog id
+        self.columns = {}      # catalog id -> matrix column
+        self.postings = {}     # catalog id -> sorted array of index rows
+        for catalog_id, name in catalog:
+            self._add_entry(catalog_id, name)
+
+        # Catalog id -> matrix column, -1 for ids missing from the catalog
+        column_of = np.full(max(self.columns, default=0) + 1, -1, dtype=np.int64)
+        column_of[list(self.columns)] = list(self.columns.values())
+
+        self._rows = n_rows
+        self._matrix = np.zeros((max(n_rows, 1), max(len(self.columns), 1)), dtype=bool)
+        keys = [np.zeros(0, dtype=np.int64)]
+        for chunk in link_chunks:
+            links = int_array(chunk, 2)
+            rows, found = lookup(links[:, 0])
+            catalog_ids = links[:, 1]
+            found &= (catalog_ids >= 0) & (catalog_ids < len(column_of))
+            rows, columns = rows[found], column_of[catalog_ids[found]]
+            known = columns >= 0
+            rows, columns = rows[known], columns[known]
+            self._matrix[rows, columns] = True
+            keys.append(columns * max(n_rows, 1) + rows)
+
+        # Sorted, distinct keys are the postings of every column in turn
+        keys = np.unique(np.concatenate(keys))
+        rows = keys % max(n_rows, 1)
+        bounds = np.searchsorted(keys // max(n_rows, 1), np.arange(len(self.columns) + 1))
+        for catalog_id, column in self.columns.items():
+            self.postings[catalog_id] = rows[bounds[column]:bounds[column + 1]]
+        self._refresh_view()
+
+    def _add_entry(self, catalog_id, name):
+        self.ids[name] = catalog_id
+        self.columns[catalog_id] = len(self.columns)
+        self.postings[catalog_id] = np.zeros(0, dtype=np.int64)
+
+    def _refresh_view(self):
+        self.matrix = self._matrix[:self._rows, :len(self.columns)]
+
+    def __getstate__(self):
+        # The matrix view would be pickled as a second copy of the buffer
+        state = self.__dict__.copy()
+        del state['matrix']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._refresh_view()
+
+    def to_arrays(self):
+        """Catalog (id, name) pairs in column order, and the matrix and postings as flat arrays
+
+        Postings are concatenated in column order; offsets[c]:offsets[c + 1]
+        delimits the rows of column c.
+        """
+        names = {catalog_id: name for name, catalog_id in self.ids.items()}
+        catalog = sorted(self.columns, key=self.columns.get)
+        offsets = np.zeros(len(catalog) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(self.postings[catalog_id]) for catalog_id in catalog])
+        postings = np.concatenate([self.postings[catalog_id] for catalog_id in catalog] + [np.zeros(0, dtype=np.int64)])
+        return [[catalog_id, names[catalog_id]] for catalog_id in catalog], {
+            'matrix': self.matrix,
+            'postings': postings,
+            'offsets': offsets,
+        }
+
+    @classmethod
+    def from_arrays(cls, catalog, arrays):
+        """Rebuild a membership from to_arrays output; the arrays are used as-is, without copying"""
+        membership = object.__new__(cls)
+        membership.ids = {}
+        membership.columns = {}
+        membership.postings = {}
+        postings, offsets = arrays['postings'], arrays['offsets']
+        for column, (catalog_id, name) in enumerate(catalog):
+            membership.ids[name] = catalog_id
+            membership.columns[catalog_id] = column
+            membership.postings[catalog_id] = postings[offsets[column]:offsets[column + 1]]
+        membership._rows = arrays['matrix'].shape[0]
+        membership._matrix = arrays['matrix']
+        membership._refresh_view()
+        return membership
+
+    def slice(self, start, stop):
+        """Copy of rows start:stop, for scoring only (posting lists are not kept)"""
+        part = object.__new__(_Membership)
+        part.ids = dict(self.ids)
+        part.columns = dict(self.columns)
+        part.postings = {}
+        part._rows = stop - start
+        part._matrix = self.matrix[start:stop].copy()
+        part._refresh_view()
+        return part
+
+    def append(self, row, entries):
+        """Add a new index row holding the given (catalog id, name) entries"""
+        for catalog_id, name in entries:
+            if catalog_id not in self.columns:
+                self._add_entry(catalog_id, name)
+
+        capacity_rows, capacity_columns = self._matrix.shape
+        if row >= capacity_rows or len(self.columns) > capacity_columns:
+            if row >= capacity_rows:
+                capacity_rows = 2 * (row + 1)
+            if len(self.columns) > capacity_columns:
+                capacity_columns = 2 * len(self.columns)
+            grown = np.zeros((capacity_rows, capacity_columns), dtype=bool)
+            grown[:self._rows, :self._matrix.shape[1]] = self._matrix[:self._rows]
+            self._matrix = grown
+
+        self._rows = row + 1
+        for catalog_id, name in entries:
+            self._matrix[row, self.columns[catalog_id]] = True
+            self.postings[catalog_id] = np.append(self.postings[catalog_id], row)
+        self._refresh_view()
+
+    def count_matches(self, catalog_ids, rows):
+        """Count, per selected row, how many of the given catalog ids are held (duplicates count twice)"""
+        counts = np.zeros(self._rows, dtype=np.int64)[rows]  # Sized like the selection without copying matrix rows
+        for catalog_id in catalog_ids:
+            column = self.columns.get(catalog_id)
+            if column is not None:
+                counts += self.matrix[rows, column]
+        return counts
+
+    def rows_with_any(self, catalog_ids):
+        """Rows holding at least one of the given catalog ids"""
+        postings = [self.postings[catalog_id] for catalog_id in catalog_ids if catalog_id in self.postings]
+        if not postings:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+class ApplicantIndex:
+    """Applicant attributes stored as NumPy columns, one row per applicant ordered by id"""
+
+    _COLUMNS = {
+        'ids': np.int64,
+        'education_rank': np.int8,
+        'experience_years': np.float64,
+        'desired_salary': np.float64,
+        'willing_to_relocate': bool,
+        'location_codes': np.int32,
+    }
+
+    def __init__(self, session):
+        self.lock = threading.RLock()
+        self.version = next(_versions)
+
+        # Locations are stored once and referenced by code, so substring checks run per distinct location
+        self.locations = []
+        self._location_codes = {}
+
+        # Buffers are sized by a count up front and only grow for applicants added meanwhile
+        capacity = session.execute(select(func.count(Applicant.id))).scalar()
+        self._size = 0
+        self._buffers = {name: np.zeros(max(capacity, 1), dtype=dtype) for name, dtype in self._COLUMNS.items()}
+        for rows in scan_rows(session, select(
+            Applicant.id,
+            Applicant.education_level,
+            Applicant.experience_years,
+            Applicant.desired_salary,
+            Applicant.willing_to_relocate,
+            Applicant.location
+        ).order_by(Applicant.id)):
+            self._reserve(self._size + len(rows))
+            for row in rows:
+                self._write_row(self._size, row)
+                self._size += 1
+        self._refresh_views()
+
+        # Skill and certification memberships, with posting lists for candidate generation
+        self.skill_membership = _Membership(
+            session.execute(select(Skill.id, Skill.name).order_by(Skill.id)).all(),
+            scan_rows(session, select(applicant_skill.c.applicant_id, applicant_skill.c.skill_id)),
+            self._lookup,
+            self._size
+        )
+        self.cert_membership = _Membership(
+            session.execute(select(Certification.id, Certification.name).order_by(Certification.id)).all(),
+            scan_rows(session, select(applicant_certification.c.applicant_id, applicant_certification.c.certification_id)),
+            self._lookup,
+            self._size
+        )
+
+    def __len__(self):
+        return self._size
+
+    def __getstate__(self):
+        # Locks cannot be pickled and column views would duplicate their buffers
+        state = self.__dict__.copy()
+        del state['lock']
+        for name in self._COLUMNS:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self._refresh_views()
+
+    def _write_row(self, row_number, applicant):
+        """Store one applicant's attributes at the given row of the column buffers"""
+        if applicant.location not in self._location_codes:
+            self._location_codes[applicant.location] = len(self.locations)
+            self.locations.append(applicant.location)
+
+        self._buffers['ids'][row_number] = applicant.id
+        self._buffers['education_rank'][row_number] = education_rank(applicant.education_level)
+        self._buffers['experience_years'][row_number] = applicant.experience_years or 0
+        self._buffers['desired_salary'][row_number] = np.nan if applicant.desired_salary is None else applicant.desired_salary
+        self._buffers['willing_to_relocate'][row_number] = bool(applicant.willing_to_relocate)
+        self._buffers['location_codes'][row_number] = self._location_codes[applicant.location]
+
+    def _reserve(self, rows):
+        """Make room for the given number of rows in the column buffers, at least doubling them when they grow"""
+        if rows > len(self._buffers['ids']):
+            capacity = max(rows, 2 * len(self._buffers['ids']))
+            for name, buffer in self._buffers.items():
+                grown = np.zeros(capacity, dtype=buffer.dtype)
+                grown[:self._size] = buffer[:self._size]
+                self._buffers[name] = grown
+
+    def _refresh_views(self):
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:self._size])
+
+    def _lookup(self, applicant_ids):
+        """Index rows of an array of applicant ids, and a mask of the ids that are indexed"""
+        rows = np.searchsorted(self.ids, applicant_ids)
+        found = rows < self._size
+        found[found] = self.ids[rows[found]] == applicant_ids[found]
+        return rows, found
+
+    def rows_of(self, applicant_ids):
+        """Index rows of the indexed applicants among applicant_ids, in row order"""
+        with self.lock:
+            rows, found = self._lookup(np.asarray(applicant_ids, dtype=np.int64))
+            return np.unique(rows[found])
+
+    def add_applicant(self, applicant):
+        """Append a newly created applicant (an ApplicantRecord, or an Applicant with skills and certifications) to the index
+
+        Returns False when the applicant cannot be appended in id order, in which
+        case the caller should rebuild the index instead.
+        """
+        with self.lock:
+            if self._size and applicant.id <= self.ids[-1]:
+                return False
+
+            row = self._size
+            self._reserve(row + 1)
+            self._write_row(row, applicant)
+            self._size += 1
+            self.version = next(_versions)
+            self._refresh_views()
+
+            self.skill_membership.append(row, [(skill.id, skill.name) for skill in applicant.skills])
+            self.cert_membership.append(row, [(cert.id, cert.name) for cert in applicant.certifications])
+            return True
+
+    def catch_up(self, session):
+        """Append the applicants committed since the index was last updated
+
+        Returns how many were appended, or None when the index no longer lines
+        up with the database (applicants committed out of id order) and must be
+        rebuilt instead. New applicants are read SCAN_CHUNK_SIZE at a time, in id order.
+        """
+        with self.lock:
+            added = 0
+            last_id = int(self.ids[-1]) if self._size else 0
+            while True:
+                applicant_ids = session.execute(
+                    select(Applicant.id).where(Applicant.id > last_id).order_by(Applicant.id).limit(SCAN_CHUNK_SIZE)
+                ).scalars().all()
+                if not applicant_ids:
+                    break
+                records = load_applicant_records(session, applicant_ids)
+                for applicant_id in applicant_ids:
+                    if applicant_id in records and not self.add_applicant(records[applicant_id]):
+                        return None
+                added += len(applicant_ids)
+                last_id = applicant_ids[-1]
+            if self._size != session.execute(select(func.count(Applicant.id))).scalar():
+                return None
+            return added
+
+    def slice(self, start, stop):
+        """Standalone copy of rows start:stop that can be pickled and scored in another process"""
+        with self.lock:
+            part = object.__new__(ApplicantIndex)
+            part.lock = threading.RLock()
+            part.version = self.version
+            part.locations = list(self.locations)
+            part._location_codes = dict(self._location_codes)
+            part._size = stop - start
+            part._buffers = {name: getattr(self, name)[start:stop].copy() for name in self._COLUMNS}
+            part._refresh_views()
+            part.skill_membership = self.skill_membership.slice(start, stop)
+            part.cert_membership = self.cert_membership.slice(start, stop)
+            return part
+
+    def to_arrays(self):
+        """Metadata and flat arrays describing the index, for writing a snapshot file"""
+        with self.lock:
+            skill_catalog, skill_arrays = self.skill_membership.to_arrays()
+            cert_catalog, cert_arrays = self.cert_membership.to_arrays()
+            meta = {
+                'size': self._size,
+                'locations': list(self.locations),
+                'skills': skill_catalog,
+                'certifications': cert_catalog,
+            }
+            arrays = {name: getattr(self, name) for name in self._COLUMNS}
+            arrays.update({f'skill_{name}': array for name, array in skill_arrays.items()})
+            arrays.update({f'cert_{name}': array for name, array in cert_arrays.items()})
+            return meta, arrays
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        """Rebuild an index from to_arrays output without copying the arrays
+
+        The arrays may be read-only (e.g. memory-mapped): they are sized to the
+        index, so appending an applicant always moves it to new buffers first.
+        """
+        index = object.__new__(cls)
+        index.lock = threading.RLock()
+        index.version = next(_versions)
+        index.locations = list(meta['locations'])
+        index._location_codes = {location: code for code, location in enumerate(index.locations)}
+        index._size = meta['size']
+        if index._size:
+            index._buffers = {name: arrays[name] for name in cls._COLUMNS}
+        else:
+            index._buffers = {name: np.zeros(1, dtype=dtype) for name, dtype in cls._COLUMNS.items()}
+        index._refresh_views()
+
+        memberships = []
+        for prefix, catalog in (('skill', meta['skills']), ('cert', meta['certifications'])):
+            member_arrays = {name: arrays[f'{prefix}_{name}'] for name in ('matrix', 'postings', 'offsets')}
+            memberships.append(_Membership.from_arrays(catalog, member_arrays))
+        index.skill_membership, index.cert_membership = memberships
+        return index
+
+    def shard_bounds(self, count):
+        """Split the rows into at most count contiguous (start, stop) ranges of near-equal size"""
+        size = -(-self._size // max(count, 1))
+        return [(start, min(start + size, self._size)) for start in range(0, self._size, max(size, 1))]
+
+    def rows_with_any(self, skill_ids=(), cert_ids=()):
+        """Rows of applicants holding at least one of the given skills or certifications"""
+        with self.lock:
+            return np.union1d(
+                self.skill_membership.rows_with_any(skill_ids),
+                self.cert_membership.rows_with_any(cert_ids)
+            ).astype(np.int64)
+
+    def skill_ids_for(self, names):
+        """Catalog ids of the known skills among the given names"""
+        return [self.skill_membership.ids[name] for name in names if name in self.skill_membership.ids]
+
+    def cert_ids_for(self, names):
+        """Catalog ids of the known certifications among the given names"""
+        return [self.cert_membership.ids[name] for name in names if name in self.cert_membership.ids]
+
+    def score_plan(self, plan, rows=None):
+        """Score applicants against a RequirementPlan
+
+        Scores every applicant, or only the given index rows, and returns an
+        integer array aligned with those rows holding the same percentages as
+        RequirementPlan.score.
+        """
+        with self.lock:
+            n = self._size if rows is None else len(rows)
+            return combine_components(plan, self.score_components(plan, rows=rows), n)
+
+    def score_components(self, plan, names=COMPONENTS, rows=None, counts=False):
+        """Points of every applicant, or of the given index rows, for each named criterion
+
+        Returns a dict of arrays aligned with those rows; criteria the plan does
+        not score map to None. combine_components adds them up into percentages.
+        With counts set the skill and certification criteria map to the number
+        of the plan's names each applicant holds instead (see share_points).
+        """
+        components = dict.fromkeys(names)
+        with self.lock:
+            # A slice keeps full-pool scoring on views instead of copies
+            selected = slice(None) if rows is None else rows
+            education_ranks = self.education_rank[selected]
+            experience_years = self.experience_years[selected]
+            desired_salary = self.desired_salary[selected]
+            willing_to_relocate = self.willing_to_relocate[selected]
+            location_codes = self.location_codes[selected]
+            locations = list(self.locations)
+            n = len(education_ranks)
+
+            # Education match (worth 20 points)
+            if 'education' in components and plan.education_rank is not None:
+                if plan.education_rank == -1:
+                    components['education'] = np.full(n, 20)
+                else:
+                    components['education'] = np.where(education_ranks >= plan.education_rank, 20, 0)
+
+            # Experience match (worth 20 points)
+            if 'experience' in components and plan.min_experience is not None:
+                min_experience = plan.min_experience
+                exp_ratio = np.minimum(experience_years / max(min_experience, 1), 2)
+                components['experience'] = np.where(experience_years >= min_experience, np.minimum(20, 10 + 5 * exp_ratio), 0)
+
+            # Required skills match (worth 30 points)
+            if 'required_skills' in components and plan.required_skill_names:
+                matched = self.skill_membership.count_matches(plan.required_skill_ids, selected)
+                components['required_skills'] = matched if counts else share_points(plan, 'required_skills', matched)
+
+            # Preferred skills match (worth 10 points)
+            if 'preferred_skills' in components and plan.preferred_skill_names:
+                matched = self.skill_membership.count_matches(plan.preferred_skill_ids, selected)
+                components['preferred_skills'] = matched if counts else share_points(plan, 'preferred_skills', matched)
+
+            # Certifications match (worth 10 points)
+            if 'certifications' in components and plan.required_cert_count:
+                matched = self.cert_membership.count_matches(plan.required_cert_ids, selected)
+                components['certifications'] = matched if counts else share_points(plan, 'certifications', matched)
+
+        # Location match (worth 5 points)
+        if 'location' in components and plan.location_preference:
+            location_matches = np.array([plan.location_matches(location) for location in locations], dtype=bool)
+            location_match = location_matches[location_codes] if n else np.zeros(0, dtype=bool)
+            relocation = willing_to_relocate & plan.relocation_required
+            components['location'] = np.where(location_match, 5, np.where(relocation, 3, 0))
+
+        # Salary match (worth 5 points)
+        if 'salary' in components and plan.has_salary_range:
+            min_salary = plan.min_salary
+            max_salary = plan.max_salary
+            with np.errstate(divide='ignore', invalid='ignore'):
+                salary_diff = np.minimum(
+                    np.abs(desired_salary - min_salary),
+                    np.abs(desired_salary - max_salary)
+                )
+                salary_ratio = np.maximum(0, 1 - (salary_diff / max_salary))
+            in_range = (desired_salary >= min_salary) & (desired_salary <= max_salary)
+            salary_score = np.where(in_range, 5, 5 * salary_ratio)
+            # Applicants without a desired salary get no salary points
+            components['salary'] = np.nan_to_num(salary_score, nan=0.0)
+
+        return components
+
+    def score_plans(self, plans):
+        """Score every applicant against several plans from one consistent snapshot
+
+        Returns a len(plans) x len(self) matrix of percentages (uint8, scores never exceed 100).
+        """
+        with self.lock:
+            scores = np.zeros((len(plans), self._size), dtype=np.uint8)
+            for number, plan in enumerate(plans):
+                scores[number] = self.score_plan(plan)
+            return scores
+
+# Process-wide index, built lazily on first use and kept current as applicants are added.
+# With MATCH_SNAPSHOT_PATH set it maps the shared snapshot file instead (see snapshot.py).
+_index = None
+_index_lock = threading.Lock()
+
+def get_applicant_index(session):
+    """Return the shared applicant index, building it from the database if needed"""
+    global _index
+    with _index_lock:
+        from .snapshot import SNAPSHOT_PATH, current_snapshot
+        if SNAPSHOT_PATH:
+            _index = current_snapshot(session, _index, SNAPSHOT_PATH)
+        elif _index is None:
+            _index = ApplicantIndex(session)
+        return _index
+
+def index_applicant(applicant):
+    """Add a committed applicant to this worker's private index, falling back to a rebuild
+
+    A shared snapshot is left alone: the applicant's background task publishes
+    it (see publish_applicant_index), off the request that added the applicant.
+    """
+    global _index
+    with _index_lock:
+        from .snapshot import SNAPSHOT_PATH
+        if not SNAPSHOT_PATH and _index is not None and not _index.add_applicant(applicant):
+            _index = None
+
+def publish_applicant_index(session):
+    """Write a new shared snapshot if the committed applicants are not all in it, and map it
+
+    Returns whether a snapshot was written here. Only used with MATCH_SNAPSHOT_PATH set.
+    """
+    global _index
+    with _index_lock:
+        from .snapshot import SNAPSHOT_PATH, publish_snapshot, _file_identity
+        previous = _file_identity(SNAPSHOT_PATH)
+        _index = publish_snapshot(session, SNAPSHOT_PATH)
+        return _index.snapshot_identity != previous
+
+def refresh_applicant_index(session):
+    """Bring the shared index up to date with applicants committed by other processes
+
+    A shared snapshot is published by the tasks of the new applicants and
+    mapped by get_applicant_index once it is replaced, so only a private index
+    catches up here.
+    """
+    global _index
+    with _index_lock:
+        from .snapshot import SNAPSHOT_PATH
+        if not SNAPSHOT_PATH and _index is not None and _index.catch_up(session) is None:
+            _index = None
+
+def invalidate_applicant_index():
+    """Drop the shared applicant index so the next match request rebuilds it"""
+    global _index
+    with _index_lock:
+        from .snapshot import SNAPSHOT_PATH, discard_snapshot
+        if SNAPSHOT_PATH:
+            discard_snapshot(SNAPSHOT_PATH)
+        _index = None
@@ -0,0 +1,183 @@
+"""
+Columnar in-memory job index used to rank job positions for one applicant
+"""
+import threading
+import numpy as np
+from sqlalchemy import select
+from ..models.models import JobPosition, JobRequirement, job_skill, job_certification
+from .index import education_rank
+
+class JobIndex:
+    """Job requirements stored as NumPy columns, one row per job position ordered by id
+
+    Required skills and certifications are kept as posting lists (catalog id ->
+    job rows), so the matched counts of an applicant are a bincount over the
+    postings of the skills they hold rather than a scan of every job.
+    """
+
+    def __init__(self, session):
+        self.lock = threading.RLock()
+        rows = session.execute(
+            select(
+                JobPosition.id,
+                JobRequirement.min_education_level,
+                JobRequirement.min_experience_years,
+                JobRequirement.location_preference,
+                JobRequirement.relocation_required,
+                JobRequirement.min_salary,
+                JobRequirement.max_salary
+            ).outerjoin(JobRequirement, JobRequirement.job_id == JobPosition.id).order_by(JobPosition.id)
+        ).all()
+
+        # A job holds at most one requirements row; keep the first if there are more
+        seen = set()
+        rows = [row for row in rows if not (row.id in seen or seen.add(row.id))]
+
+        n = len(rows)
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+
+        # Education and experience always count for jobs; without a level everyone gets the points
+        self.education_rank = np.array(
+            [education_rank(row.min_education_level) if row.min_education_level else -1 for row in rows],
+            dtype=np.int8
+        )
+        self.min_experience = np.array([row.min_experience_years or 0 for row in rows], dtype=np.float64)
+
+        # Location preferences are stored once and referenced by code (-1 for none)
+        self.locations = []
+        location_codes = {}
+        codes = np.full(n, -1, dtype=np.int32)
+        for row_number, row in enumerate(rows):
+            if row.location_preference:
+                if row.location_preference not in location_codes:
+                    location_codes[row.location_preference] = len(self.locations)
+                    self.locations.append(row.location_preference)
+                codes[row_number] = location_codes[row.location_preference]
+        self.location_codes = codes
+        self.relocation_required = np.array([bool(row.relocation_required) for row in rows], dtype=bool)
+
+        # A salary range only counts when both bounds are set and non-zero
+        self.has_salary_range = np.array([bool(row.min_salary and row.max_salary) for row in rows], dtype=bool)
+        self.min_salary = np.array([row.min_salary if row.min_salary else 0 for row in rows], dtype=np.float64)
+        self.max_salary = np.array([row.max_salary if row.max_salary else 0 for row in rows], dtype=np.float64)
+
+        # Required skill and certification postings, with the number required per job
+        self.skill_postings, self.required_skill_counts = self._postings(
+            session.execute(select(job_skill.c.job_id, job_skill.c.skill_id)).all()
+        )
+        self.cert_postings, self.required_cert_counts = self._postings(
+            session.execute(select(job_certification.c.job_id, job_certification.c.certification_id)).all()
+        )
+
+        # Points at stake per job
+        self.max_score = (
+            40
+            + np.where(self.required_skill_counts > 0, 30, 0)
+            + np.where(self.required_cert_counts > 0, 10, 0)
+            + np.where(self.location_codes >= 0, 5, 0)
+            + np.where(self.has_salary_range, 5, 0)
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, job_id):
+        """Index row of a job id, or None when the job is not indexed"""
+        row = int(np.searchsorted(self.ids, job_id))
+        if row < len(self.ids) and self.ids[row] == job_id:
+            return row
+        return None
+
+    def _postings(self, links):
+        """Build catalog id -> sorted job rows postings and per-job counts from (job_id, catalog_id) links"""
+        rows_by_entry = {}
+        for job_id, catalog_id in links:
+            row = self.row_of(job_id)
+            if row is not None:
+                # Repeated links are kept, as they count twice in the job's requirements
+                rows_by_entry.setdefault(catalog_id, []).append(row)
+
+        postings = {}
+        counts = np.zeros(len(self.ids), dtype=np.int64)
+        for catalog_id, rows in rows_by_entry.items():
+            postings[catalog_id] = np.array(sorted(rows), dtype=np.int64)
+            np.add.at(counts, postings[catalog_id], 1)
+        return postings, counts
+
+    def _matched_counts(self, postings, catalog_ids):
+        """Per job, how many of its required entries are among catalog_ids"""
+        held = [postings[catalog_id] for catalog_id in catalog_ids if catalog_id in postings]
+        if not held:
+            return np.zeros(len(self.ids), dtype=np.int64)
+        return np.bincount(np.concatenate(held), minlength=len(self.ids))
+
+    def score_profile(self, profile):
+        """Score one ApplicantProfile against every job
+
+        Returns an integer array aligned with the job rows holding the same
+        percentages as RequirementPlan.from_job(job).score(profile).
+        """
+        with self.lock:
+            n = len(self.ids)
+            score = np.zeros(n, dtype=np.float64)
+
+            # Education match (worth 20 points)
+            score += np.where((self.education_rank == -1) | (profile.education_rank >= self.education_rank), 20, 0)
+
+            # Experience match (worth 20 points)
+            experience_years = profile.experience_years
+            exp_ratio = np.minimum(experience_years / np.maximum(self.min_experience, 1), 2)
+            score += np.where(experience_years >= self.min_experience, np.minimum(20, 10 + 5 * exp_ratio), 0)
+
+            # Required skills match (worth 30 points)
+            matched = self._matched_counts(self.skill_postings, profile.skill_ids)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                score += np.where(self.required_skill_counts > 0, 30 * (matched / self.required_skill_counts), 0)
+
+            # Certifications match (worth 10 points)
+            matched = self._matched_counts(self.cert_postings, profile.cert_ids)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                score += np.where(self.required_cert_counts > 0, 10 * (matched / self.required_cert_counts), 0)
+
+            # Location match (worth 5 points)
+            location = profile.location
+            location_matches = np.array(
+                [location is not None and (preference in location or location in preference) for preference in self.locations] + [False],
+                dtype=bool
+            )
+            location_match = location_matches[self.location_codes]  # code -1 picks the trailing False
+            relocation = profile.willing_to_relocate & self.relocation_required
+            score += np.where(self.location_codes >= 0, np.where(location_match, 5, np.where(relocation, 3, 0)), 0)
+
+            # Salary match (worth 5 points)
+            if profile.desired_salary is not None:
+                desired_salary = profile.desired_salary
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    salary_diff = np.minimum(
+                        np.abs(desired_salary - self.min_salary),
+                        np.abs(desired_salary - self.max_salary)
+                    )
+                    salary_ratio = np.maximum(0, 1 - (salary_diff / self.max_salary))
+                in_range = (desired_salary >= self.min_salary) & (desired_salary <= self.max_salary)
+                score += np.where(self.has_salary_range, np.where(in_range, 5, 5 * salary_ratio), 0)
+
+            # Calculate final percentage (every job has at least the 40 education and experience points)
+            return np.rint((score / self.max_score) * 100).astype(np.int64)
+
+# Process-wide index, built lazily on first use and rebuilt after jobs change
+_index = None
+_index_lock = threading.Lock()
+
+def get_job_index(session):
+    """Return the shared job index, building it from the database if needed"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = JobIndex(session)
+        return _index
+
+def invalidate_job_index():
+    """Drop the shared job index so the next reverse match request rebuilds it"""
+    global _index
+    with _index_lock:
+        _index = None
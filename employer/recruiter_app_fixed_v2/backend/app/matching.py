@@ -1,9 +1,47 @@
 """
 Matching algorithm for applicants and job requirements
 """
-from sqlalchemy import desc
-from ..models.models import Applicant, JobPosition, JobRequirement, Skill, Certification, ApplicantMatch
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from sqlalchemy import desc, func, select
+from ..models.models import (
+    Applicant, JobPosition, ApplicantMatch, JobMatchStatus, JOB_EAGER_LOAD
+)
 from ..database.db import get_db_session, close_db_session
+from .index import (
+    COMPONENTS, SESSION_COMPONENTS, combine_components, compact_components, expand_components,
+    get_applicant_index, int_array, scan_rows
+)
+from .job_index import get_job_index
+from .plans import RequirementPlan, applicant_profile
+from .records import load_applicant_record, load_applicant_records
+from .parallel import get_sharded_scorer, reset_sharded_scorer
+from .cache import requirements_cache, search_sessions, requirement_flights, job_match_flights
+from .constraints import must_have_clauses, must_have_key, qualifying_applicant_ids
+from .sql_scoring import SqlCatalog, SqlScorer
+
+# 'index' scores on the in-memory applicant index, 'sql' inside the database (meant for PostgreSQL)
+MATCHING_BACKEND = os.getenv('MATCHING_BACKEND', 'index')
+
+# Candidates scored between deadline checks of a time-budgeted search
+DEADLINE_BLOCK_SIZE = int(os.getenv('MATCH_DEADLINE_BLOCK_SIZE', '50000'))
+
+def _deadline(deadline_ms):
+    """time.monotonic() value at which a search given deadline_ms milliseconds stops scoring, or None"""
+    return None if deadline_ms is None else time.monotonic() + deadline_ms / 1000
+
+def _last_id(index):
+    """Largest applicant id in an applicant index (ids are kept sorted), 0 when it is empty"""
+    return int(index.ids[-1]) if len(index.ids) else 0
+
+def _priority_blocks(rows, held, block_size):
+    """Split rows into blocks of block_size, rows with higher held counts first and in row order within a count"""
+    # A stable sort of small integer keys runs as a radix sort
+    ordered = rows[np.argsort(-np.minimum(held, np.iinfo(np.int16).max).astype(np.int16), kind='stable')]
+    for start in range(0, len(ordered), block_size):
+        yield ordered[start:start + block_size]
 
 class MatchingEngine:
     """Engine for matching applicants to job requirements"""
@@ -14,388 +52,577 @@ class MatchingEngine:
     def __del__(self):
         close_db_session(self.session)
     
-    def find_matching_applicants(self, job_id):
-        """Find applicants matching a job position's requirements"""
-        job = self.session.query(JobPosition).filter(JobPosition.id == job_id).first()
+    def find_matching_applicants(self, job_id, limit=None, offset=0, include_analysis=True, refresh=False, stream=False,
+                                 deadline_ms=None, before_scoring=None):
+        """Find applicants matching a job position's requirements
+        
+        Scores are read from the applicant_matches table, which is filled on the first
+        request for a job (or when refresh is set) and kept current afterwards.
+        Returns the requested page of matches (best first), the total number of matches
+        and the fraction of the applicant pool scored (1.0 for a complete result).
+        Match analysis is only generated for the applicants on the page. With stream
+        set, the matches are returned as an iterator that loads applicants in chunks.
+        When the matches have to be computed and deadline_ms is given, scoring stops
+        after about that many milliseconds; a result left incomplete is returned from
+        the applicants scored so far and not stored. Concurrent requests that find the
+        matches missing share one refresh. before_scoring, when given, is called
+        before the matches are computed (the route takes admission for a scoring pass).
+        """
+        deadline = _deadline(deadline_ms)
+        job = self.session.query(JobPosition).options(*JOB_EAGER_LOAD).filter(JobPosition.id == job_id).first()
         if not job:
-            return []
-            
-        # Get all applicants
-        applicants = self.session.query(Applicant).all()
-        
-        # Calculate match scores
-        matches = []
-        for applicant in applicants:
-            match_score = self._calculate_match_score(applicant, job)
-            if match_score > 30:  # Only include reasonable matches
-                match = {
-                    "applicant": applicant,
-                    "match_score": match_score,
-                    "match_analysis": self._generate_match_analysis(applicant, job)
-                }
-                matches.append(match)
-                
-                # Save match to database
-                self._save_match(applicant.id, job.id, match_score)
-        
-        # Sort by match score (descending)
-        matches.sort(key=lambda x: x["match_score"], reverse=True)
-        return matches
+            return [], 0, 1.0
+        
+        plan = RequirementPlan.from_job(job)
+        analyze = plan.analyze if include_analysis else None
+        if refresh or not self.session.get(JobMatchStatus, job.id):
+            if before_scoring:
+                before_scoring()
+            scored = None
+            if deadline is not None and MATCHING_BACKEND != 'sql':
+                index = get_applicant_index(self.session)
+                last_id = _last_id(index)
+                applicant_ids, scores, scanned = self.score_plan_until(plan, deadline, index)
+                if scanned < 1.0:
+                    page = self._select_scored_page(applicant_ids, scores, limit, offset)
+                    return self._build_matches(page, analyze, stream), len(scores), scanned
+                scored = (applicant_ids, scores, last_id)
+            self.store_job_matches(job.id, refresh=refresh, scored=scored)
+        
+        # Read the requested page in score order from the stored matches
+        total = self.session.query(func.count(ApplicantMatch.id)).filter(ApplicantMatch.job_id == job.id).scalar()
+        query = self.session.query(ApplicantMatch.applicant_id, ApplicantMatch.match_score).filter(
+            ApplicantMatch.job_id == job.id
+        ).order_by(desc(ApplicantMatch.match_score), ApplicantMatch.applicant_id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        page = [(applicant_id, match_score) for applicant_id, match_score in query]
+        return self._build_matches(page, analyze, stream), total, 1.0
     
-    def find_matching_applicants_from_requirements(self, requirements):
-        """Find applicants matching requirements without creating a job position"""
-        # Get all applicants
-        applicants = self.session.query(Applicant).all()
-        
-        # Calculate match scores
-        matches = []
-        for applicant in applicants:
-            match_score = self._calculate_match_score_from_requirements(applicant, requirements)
-            if match_score > 30:  # Only include reasonable matches
-                match = {
-                    "applicant": applicant,
+    def find_matching_applicants_from_requirements(self, requirements, limit=None, offset=0, include_analysis=True, stream=False,
+                                                   search_session=None, deadline_ms=None):
+        """Find applicants matching requirements without creating a job position
+        
+        Returns the requested page of matches (best first), the total number of matches
+        and the fraction of the applicant pool scored (1.0 for a complete result).
+        Match analysis is only generated for the applicants on the page. With stream
+        set, the matches are returned as an iterator that loads applicants in chunks.
+        Criteria listed under requirements['mustHave'] exclude applicants who miss
+        them; ValueError is raised for an invalid mustHave list. Searches sharing a
+        search_session id reuse the scores of the criteria they did not change. A search
+        that waits for an identical one of another session takes over the points kept
+        for that session, if any; one served from the result cache leaves its session as it was.
+        With deadline_ms, scoring stops after about that many milliseconds (see
+        score_plan_until) instead of using the search session; only complete results
+        are cached. The SQL backend always returns complete results. Identical
+        searches running at the same time share one computation.
+        """
+        deadline = _deadline(deadline_ms)
+        if search_session is not None and not isinstance(search_session, str):
+            raise ValueError("searchSession must be a string")
+        # Validates the must-have criteria before anything is compiled from them
+        clauses = must_have_clauses(requirements)
+        
+        if MATCHING_BACKEND == 'sql':
+            # Only the requested page of ids and scores leaves the database
+            plan = RequirementPlan.from_requirements(requirements, SqlCatalog(self.session))
+            page, total = SqlScorer(self.session).top(plan, limit, offset, clauses)
+            analyze = plan.analyze if include_analysis else None
+            return self._build_matches(page, analyze, stream), total, 1.0
+        
+        # Identical or equivalent searches share one cached list of scores. The cache
+        # generation is read before the index, so scores computed on an index that is
+        # replaced meanwhile are not stored
+        generation = requirements_cache.generation
+        index = get_applicant_index(self.session)
+        plan = RequirementPlan.from_requirements(requirements, index)
+        key = plan.cache_key(must_have_key(requirements))
+        scored = requirements_cache.get(key)
+        scanned = 1.0
+        if scored is None and deadline is not None:
+            scored, scanned = self._score_requirements(plan, index, clauses, key, generation, deadline=deadline)
+        elif scored is None:
+            # Identical searches running at the same time wait for one of them to score
+            # the plan, made with the search session of that one
+            scored, scanned, scored_session = requirement_flights.do(
+                (key, index.version),
+                lambda: self._score_requirements(plan, index, clauses, key, generation, search_session) + (search_session,)
+            )
+            if search_session is not None and scored_session not in (None, search_session):
+                # The points kept for the search that scored the plan are those this one
+                # would have kept; without them its session scores every criterion next time
+                entry = search_sessions.get(scored_session)
+                if entry is not None:
+                    search_sessions.set(search_session, entry)
+        
+        applicant_ids, scores = scored
+        page = self._select_scored_page(applicant_ids, scores, limit, offset)
+        analyze = plan.analyze if include_analysis else None
+        return self._build_matches(page, analyze, stream), len(scores), scanned
+    
+    def _score_requirements(self, plan, index, clauses, key, generation, search_session=None, deadline=None):
+        """Score an ad-hoc requirement plan on index and cache complete results under key
+        
+        Returns the scored (applicant_ids, scores) arrays and the fraction of the
+        applicant pool scored.
+        """
+        # Must-have criteria narrow the candidates in SQL before anything is scored
+        within = None
+        if clauses:
+            within = index.rows_of(qualifying_applicant_ids(self.session, clauses))
+        scanned = 1.0
+        if deadline is not None:
+            applicant_ids, scores, scanned = self.score_plan_until(plan, deadline, index, within)
+            scored = (applicant_ids, scores)
+        elif search_session is not None:
+            scored = self.score_session_plan(plan, search_session, index, within)
+        else:
+            scored = self.score_plan_arrays(plan, index, within)
+        for array in scored:
+            array.flags.writeable = False  # Shared by every hit on the cache entry
+        if scanned == 1.0:
+            requirements_cache.set(key, scored, generation)
+        return scored, scanned
+    
+    def find_matching_applicants_for_jobs(self, job_ids, limit=10, include_analysis=False):
+        """Find the best applicants for several job positions at once
+        
+        Every job is compiled once and scored against the same applicant index
+        snapshot as a jobs x applicants matrix, and the applicants on all pages are
+        loaded together. Returns (job, matches, total) for each existing job, in the
+        order of job_ids.
+        """
+        jobs = {
+            job.id: job
+            for job in self.session.query(JobPosition).options(*JOB_EAGER_LOAD).filter(JobPosition.id.in_(job_ids))
+        }
+        jobs = [jobs[job_id] for job_id in dict.fromkeys(job_ids) if job_id in jobs]
+        plans = [RequirementPlan.from_job(job) for job in jobs]
+        
+        index = get_applicant_index(self.session)
+        with index.lock:
+            scores = index.score_plans(plans)
+            applicant_ids = index.ids[:scores.shape[1]].copy()
+        
+        # Best passing applicants per job: score descending, then applicant id
+        pages = []
+        for row in scores:
+            passing = row > 30
+            pages.append((int(np.count_nonzero(passing)), self._select_scored_page(applicant_ids[passing], row[passing], limit, 0)))
+        
+        applicants = self._load_applicants(sorted({applicant_id for _, page in pages for applicant_id, _ in page}))
+        results = []
+        for job, plan, (total, page) in zip(jobs, plans, pages):
+            matches = [
+                {
+                    "applicant": applicants[applicant_id],
                     "match_score": match_score,
-                    "match_analysis": self._generate_match_analysis_from_requirements(applicant, requirements)
+                    "match_analysis": plan.analyze(applicants[applicant_id]) if include_analysis else None
                 }
-                matches.append(match)
-        
-        # Sort by match score (descending)
-        matches.sort(key=lambda x: x["match_score"], reverse=True)
-        return matches
+                for applicant_id, match_score in page
+            ]
+            results.append((job, matches, total))
+        return results
     
-    def _calculate_match_score(self, applicant, job):
-        """Calculate match score between an applicant and a job position"""
-        score = 0
-        max_score = 0
-        
-        # Get job requirements
-        requirements = job.requirements
-        
-        # Education match (worth 20 points)
-        max_score += 20
-        if requirements.min_education_level:
-            education_levels = ['High School', 'Associate\'s', 'Bachelor\'s', 'Master\'s', 'PhD']
-            req_education_index = education_levels.index(requirements.min_education_level) if requirements.min_education_level in education_levels else -1
-            app_education_index = education_levels.index(applicant.education_level) if applicant.education_level in education_levels else -1
-            
-            if req_education_index == -1 or app_education_index >= req_education_index:
-                score += 20
-        else:
-            score += 20
-        
-        # Experience match (worth 20 points)
-        max_score += 20
-        if applicant.experience_years >= requirements.min_experience_years:
-            exp_ratio = min(applicant.experience_years / max(requirements.min_experience_years, 1), 2)
-            score += min(20, 10 + 5 * exp_ratio)
-        
-        # Required skills match (worth 30 points)
-        required_skills = job.required_skills
-        if required_skills:
-            max_score += 30
-            
-            # Get applicant skills
-            applicant_skills = applicant.skills
-            applicant_skill_names = [skill.name for skill in applicant_skills]
-            
-            # Count matched skills
-            matched_skills = [skill for skill in required_skills if skill.name in applicant_skill_names]
-            
-            # Calculate score based on ratio of matched skills
-            skill_ratio = len(matched_skills) / len(required_skills) if required_skills else 0
-            score += 30 * skill_ratio
-        
-        # Certifications match (worth 10 points)
-        required_certs = job.required_certifications
-        if required_certs:
-            max_score += 10
-            
-            # Get applicant certifications
-            applicant_certs = applicant.certifications
-            applicant_cert_names = [cert.name for cert in applicant_certs]
-            
-            # Count matched certifications
-            matched_certs = [cert for cert in required_certs if cert.name in applicant_cert_names]
-            
-            # Calculate score based on ratio of matched certifications
-            cert_ratio = len(matched_certs) / len(required_certs) if required_certs else 0
-            score += 10 * cert_ratio
-        
-        # Location match (worth 5 points)
-        if requirements.location_preference:
-            max_score += 5
-            if requirements.location_preference in applicant.location or applicant.location in requirements.location_preference:
-                score += 5
-            elif applicant.willing_to_relocate and requirements.relocation_required:
-                score += 3
-        
-        # Salary match (worth 5 points)
-        if requirements.min_salary and requirements.max_salary:
-            max_score += 5
-            if applicant.desired_salary >= requirements.min_salary and applicant.desired_salary <= requirements.max_salary:
-                score += 5
-            else:
-                salary_diff = min(
-                    abs(applicant.desired_salary - requirements.min_salary),
-                    abs(applicant.desired_salary - requirements.max_salary)
-                )
-                salary_ratio = max(0, 1 - (salary_diff / requirements.max_salary))
-                score += 5 * salary_ratio
-        
-        # Calculate final percentage
-        return round((score / max_score) * 100) if max_score > 0 else 0
+    def _score_job_snapshot(self, job):
+        """Arrays of the applicant ids and match scores of a job above the cutoff, and the largest applicant id the scoring saw
+        
+        The id is read before scoring, so every applicant up to it was scored.
+        """
+        if MATCHING_BACKEND == 'sql':
+            last_id = self.session.execute(select(func.max(Applicant.id))).scalar() or 0
+            return (*SqlScorer(self.session).score_arrays(RequirementPlan.from_job(job)), last_id)
+        index = get_applicant_index(self.session)
+        last_id = _last_id(index)
+        return (*self.score_plan_arrays(RequirementPlan.from_job(job), index), last_id)
     
-    def _calculate_match_score_from_requirements(self, applicant, requirements):
-        """Calculate match score between an applicant and requirements dictionary"""
-        score = 0
-        max_score = 0
-        
-        # Education match (worth 20 points)
-        if requirements.get('educationLevel'):
-            max_score += 20
-            education_levels = ['High School', 'Associate\'s', 'Bachelor\'s', 'Master\'s', 'PhD']
-            req_education_index = education_levels.index(requirements['educationLevel']) if requirements['educationLevel'] in education_levels else -1
-            app_education_index = education_levels.index(applicant.education_level) if applicant.education_level in education_levels else -1
-            
-            if req_education_index == -1 or app_education_index >= req_education_index:
-                score += 20
-        
-        # Experience match (worth 20 points)
-        if requirements.get('experienceYears') is not None:
-            max_score += 20
-            if applicant.experience_years >= requirements['experienceYears']:
-                exp_ratio = min(applicant.experience_years / max(requirements['experienceYears'], 1), 2)
-                score += min(20, 10 + 5 * exp_ratio)
-        
-        # Required skills match (worth 30 points)
-        if requirements.get('requiredSkills'):
-            max_score += 30
-            
-            # Get applicant skills
-            applicant_skills = [skill.name for skill in applicant.skills]
-            
-            # Count matched skills
-            matched_skills = [skill for skill in requirements['requiredSkills'] if skill in applicant_skills]
-            
-            # Calculate score based on ratio of matched skills
-            skill_ratio = len(matched_skills) / len(requirements['requiredSkills']) if requirements['requiredSkills'] else 0
-            score += 30 * skill_ratio
-        
-        # Preferred skills match (worth 10 points)
-        if requirements.get('preferredSkills'):
-            max_score += 10
-            
-            # Get applicant skills
-            applicant_skills = [skill.name for skill in applicant.skills]
-            
-            # Count matched skills
-            matched_skills = [skill for skill in requirements['preferredSkills'] if skill in applicant_skills]
-            
-            # Calculate score based on ratio of matched skills
-            skill_ratio = len(matched_skills) / len(requirements['preferredSkills']) if requirements['preferredSkills'] else 0
-            score += 10 * skill_ratio
-        
-        # Certifications match (worth 10 points)
-        if requirements.get('requiredCertifications'):
-            max_score += 10
+    def score_plan_arrays(self, plan, index=None, within=None):
+        """Score applicants against a compiled RequirementPlan
+        
+        within, when given, restricts scoring to those index rows. Returns arrays of
+        the applicant ids and match scores above the cutoff, in applicant order.
+        """
+        if index is None:
+            index = get_applicant_index(self.session)
+        
+        # Only applicants that can still pass the cutoff need to be scored
+        rows = within
+        if plan.only_related_can_pass():
+            rows = index.rows_with_any(skill_ids=plan.related_skill_ids(), cert_ids=plan.required_cert_ids)
+            if within is not None:
+                rows = np.intersect1d(rows, within)
+        
+        # Score the candidates at once using the columnar index, split across
+        # worker processes when the pool is large enough to pay for it
+        scorer = get_sharded_scorer(len(index) if rows is None else len(rows))
+        scores = None
+        if scorer is not None:
+            try:
+                scores = scorer.score(index, plan, rows)
+            except BrokenProcessPool:
+                reset_sharded_scorer()
+        if scores is None:
+            scores = index.score_plan(plan, rows)
+        
+        # Applicants appended while scoring were not scored
+        applicant_ids = index.ids[:len(scores)] if rows is None else index.ids[rows]
+        
+        # Only include reasonable matches
+        passing = scores > 30
+        return applicant_ids[passing], scores[passing]
+    
+    def score_plan_until(self, plan, deadline, index=None, within=None):
+        """Like score_plan_arrays, but stops scoring candidates once time.monotonic() passes deadline
+        
+        Candidates are scored in blocks of DEADLINE_BLOCK_SIZE, those holding the
+        most required skills first, and at least one block is always scored.
+        Returns the applicant ids and match scores above the cutoff among the
+        scored candidates (in applicant order), and the fraction of candidates scored.
+        """
+        if index is None:
+            index = get_applicant_index(self.session)
+        
+        with index.lock:
+            rows = within
+            if plan.only_related_can_pass():
+                rows = index.rows_with_any(skill_ids=plan.related_skill_ids(), cert_ids=plan.required_cert_ids)
+                if within is not None:
+                    rows = np.intersect1d(rows, within)
             
-            # Get applicant certifications
-            applicant_certs = [cert.name for cert in applicant.certifications]
+            # Required skills held per candidate set the scoring order
+            held = index.skill_membership.count_matches(plan.required_skill_ids, slice(None) if rows is None else rows)
+            if rows is None:
+                rows = np.arange(len(index))
             
-            # Count matched certifications
-            matched_certs = [cert for cert in requirements['requiredCertifications'] if cert in applicant_certs]
+            scored_rows = [np.zeros(0, dtype=np.int64)]
+            scores = [np.zeros(0, dtype=np.int64)]
+            for block in _priority_blocks(rows, held, DEADLINE_BLOCK_SIZE):
+                if len(scored_rows) > 1 and time.monotonic() >= deadline:
+                    break
+                scored_rows.append(block)
+                scores.append(index.score_plan(plan, block))
+            scored_rows = np.concatenate(scored_rows)
+            scores = np.concatenate(scores)
             
-            # Calculate score based on ratio of matched certifications
-            cert_ratio = len(matched_certs) / len(requirements['requiredCertifications']) if requirements['requiredCertifications'] else 0
-            score += 10 * cert_ratio
-        
-        # Location match (worth 5 points)
-        if requirements.get('locationPreference'):
-            max_score += 5
-            if requirements['locationPreference'] in applicant.location or applicant.location in requirements['locationPreference']:
-                score += 5
-            elif applicant.willing_to_relocate and requirements.get('relocationRequired'):
-                score += 3
-        
-        # Salary match (worth 5 points)
-        if requirements.get('minSalary') is not None and requirements.get('maxSalary') is not None:
-            max_score += 5
-            if applicant.desired_salary >= requirements['minSalary'] and applicant.desired_salary <= requirements['maxSalary']:
-                score += 5
-            else:
-                salary_diff = min(
-                    abs(applicant.desired_salary - requirements['minSalary']),
-                    abs(applicant.desired_salary - requirements['maxSalary'])
+            # Only include reasonable matches, back in applicant order
+            passing = scores > 30
+            scored_rows, scores = scored_rows[passing], scores[passing]
+            order = np.argsort(scored_rows, kind='stable')
+            scanned = (len(passing) / len(rows)) if len(rows) else 1.0
+            return index.ids[scored_rows[order]], scores[order], scanned
+    
+    def score_session_plan(self, plan, search_session, index=None, within=None):
+        """Like score_plan_arrays, reusing the per-criterion points of the session's earlier searches
+        
+        The points of every applicant are kept per criterion, keyed by the criterion's
+        value, so a search that changes only some criteria recomputes only those and
+        adds the totals up again. Only the criteria of SESSION_COMPONENTS are kept, as
+        small unsigned integers. within, when given, restricts the result to those index rows.
+        """
+        if index is None:
+            index = get_applicant_index(self.session)
+        
+        keys = plan.component_keys()
+        with index.lock:
+            # Points computed on another version of the index are of no use
+            entry = search_sessions.get(search_session)
+            if entry is None or entry['version'] != index.version:
+                entry = {'version': index.version, 'components': {}}
+            kept = {
+                name: values
+                for name, (key, values) in entry['components'].items()
+                if key == keys[name]
+            }
+            kept.update(compact_components(index.score_components(
+                plan, [name for name in SESSION_COMPONENTS if name not in kept], counts=True
+            )))
+            components = index.score_components(plan, [name for name in COMPONENTS if name not in SESSION_COMPONENTS])
+            components.update(expand_components(plan, kept))
+            scores = combine_components(plan, components, len(index))
+            applicant_ids = index.ids[:len(scores)]
+        search_sessions.set(search_session, {
+            'version': entry['version'],
+            'components': {name: (keys[name], kept[name]) for name in SESSION_COMPONENTS},
+        })
+        
+        if within is not None:
+            scores = scores[within]
+            applicant_ids = applicant_ids[within]
+        
+        # Only include reasonable matches
+        passing = scores > 30
+        return applicant_ids[passing], scores[passing]
+    
+    def find_matching_jobs(self, applicant_id, limit=None, offset=0, include_analysis=True):
+        """Find the job positions an applicant matches best
+        
+        Every job is scored at once through the job index. Returns the requested page
+        of matches (best first, then job id) and the total number of matches, or None
+        when the applicant does not exist. Match analysis is only generated for the
+        jobs on the page.
+        """
+        applicant = load_applicant_record(self.session, applicant_id)
+        if not applicant:
+            return None
+        
+        index = get_job_index(self.session)
+        scores = index.score_profile(applicant_profile(applicant))
+        passing = np.flatnonzero(scores > 30)
+        order = passing[np.argsort(-scores[passing], kind='stable')][offset:]
+        if limit is not None:
+            order = order[:limit]
+        page = list(zip(index.ids[order].tolist(), scores[order].tolist()))
+        
+        jobs = {
+            job.id: job
+            for job in self.session.query(JobPosition).options(*JOB_EAGER_LOAD).filter(
+                JobPosition.id.in_([job_id for job_id, _ in page])
+            )
+        }
+        matches = []
+        for job_id, match_score in page:
+            job = jobs.get(job_id)
+            if job is None:
+                continue  # Deleted since the index was built
+            matches.append({
+                "job": job,
+                "match_score": match_score,
+                "match_analysis": RequirementPlan.from_job(job).analyze(applicant) if include_analysis else None
+            })
+        return matches, len(passing)
+    
+    def analyze_job_match(self, job_id, applicant_id):
+        """Score a single applicant against a job position and explain the match
+        
+        Returns None when the job or the applicant does not exist.
+        """
+        job = self.session.query(JobPosition).options(*JOB_EAGER_LOAD).filter(JobPosition.id == job_id).first()
+        applicant = load_applicant_record(self.session, applicant_id)
+        if not job or not applicant:
+            return None
+        
+        plan = RequirementPlan.from_job(job)
+        return {
+            "match_score": plan.score(applicant_profile(applicant)),
+            "match_analysis": plan.analyze(applicant)
+        }
+    
+    def store_job_matches(self, job_id, refresh=False, progress=None, scored=None):
+        """Store the matches of a job position unless they are stored already or refresh is set
+        
+        The job's background task and requests finding its matches missing wait for
+        one refresh instead of each scoring and storing the matches, and the stored
+        mark is read again inside, so a refresh that finished meanwhile is not repeated.
+        """
+        def store():
+            stored = self.session.execute(select(JobMatchStatus.job_id).where(JobMatchStatus.job_id == job_id)).first()
+            if refresh or stored is None:
+                self.refresh_job_matches(job_id, progress=progress, scored=scored)
+        
+        job_match_flights.do(job_id, store)
+    
+    def refresh_job_matches(self, job_id, progress=None, chunk_size=10000, scored=None):
+        """Recompute and store the matches of one job position against every applicant
+        
+        progress, when given, is called with the fraction of the work done (scoring
+        is the first half, storing the matches in chunks of chunk_size the second).
+        scored, when given, holds the job's (applicant ids, match scores) arrays
+        already computed by the caller and the largest applicant id it scored.
+        
+        Only the stored matches of applicants the scoring saw are dropped, so rows
+        written meanwhile by applicant_matches tasks survive. Applicants committed
+        after the scoring are scored once the job is marked as scored; the tasks of
+        any committed later find the mark and store their matches themselves.
+        """
+        job = self.session.get(JobPosition, job_id, options=JOB_EAGER_LOAD)
+        if not job:
+            return
+        
+        # Passing applicant ids come back sorted, as an array rather than Python objects
+        applicant_ids, scores, last_id = self._score_job_snapshot(job) if scored is None else scored
+        if progress:
+            progress(0.5)
+        
+        # Drop applicants that no longer pass the cutoff, then upsert the rest. The
+        # stored matches are streamed in chunks and looked up in the sorted ids
+        stale = [np.zeros(0, dtype=np.int64)]
+        for rows in scan_rows(self.session, select(ApplicantMatch.applicant_id).where(
+            ApplicantMatch.job_id == job.id, ApplicantMatch.applicant_id <= last_id
+        )):
+            stored = int_array(rows, 1)[:, 0]
+            if len(applicant_ids):
+                positions = np.minimum(np.searchsorted(applicant_ids, stored), len(applicant_ids) - 1)
+                stored = stored[applicant_ids[positions] != stored]
+            stale.append(stored)
+        self._delete_matches(ApplicantMatch.job_id == job.id, ApplicantMatch.applicant_id, np.concatenate(stale).tolist())
+        for start in range(0, len(scores), chunk_size):
+            self._save_matches([
+                {"applicant_id": applicant_id, "job_id": job.id, "match_score": match_score}
+                for applicant_id, match_score in zip(
+                    applicant_ids[start:start + chunk_size].tolist(), scores[start:start + chunk_size].tolist()
                 )
-                salary_ratio = max(0, 1 - (salary_diff / requirements['maxSalary']))
-                score += 5 * salary_ratio
-        
-        # Calculate final percentage
-        return round((score / max_score) * 100) if max_score > 0 else 0
+            ])
+            if progress:
+                progress(0.5 + 0.5 * min(start + chunk_size, len(scores)) / len(scores))
+        self._upsert(JobMatchStatus.__table__, [{"job_id": job.id}], ['job_id'], {"scored_at": func.now()})
+        self.session.commit()
+        self._score_applicants_after(job, last_id, chunk_size)
     
-    def _generate_match_analysis(self, applicant, job):
-        """Generate analysis of match strengths and gaps"""
-        strengths = []
-        gaps = []
-        
-        # Get job requirements
-        requirements = job.requirements
-        
-        # Education analysis
-        if requirements.min_education_level:
-            education_levels = ['High School', 'Associate\'s', 'Bachelor\'s', 'Master\'s', 'PhD']
-            req_education_index = education_levels.index(requirements.min_education_level) if requirements.min_education_level in education_levels else -1
-            app_education_index = education_levels.index(applicant.education_level) if applicant.education_level in education_levels else -1
-            
-            if req_education_index != -1 and app_education_index != -1:
-                if app_education_index > req_education_index:
-                    strengths.append(f"Education exceeds requirements ({applicant.education_level} vs required {requirements.min_education_level})")
-                elif app_education_index == req_education_index:
-                    strengths.append(f"Education matches requirements ({applicant.education_level})")
+    def _score_applicants_after(self, job, last_id, chunk_size):
+        """Store the matches of the applicants with an id above last_id for a job, chunk_size at a time"""
+        plan = RequirementPlan.from_job(job)
+        while True:
+            new_ids = self.session.execute(
+                select(Applicant.id).where(Applicant.id > last_id).order_by(Applicant.id).limit(chunk_size)
+            ).scalars().all()
+            if not new_ids:
+                return
+            rows = []
+            stale = []
+            for applicant_id, applicant in load_applicant_records(self.session, new_ids).items():
+                match_score = plan.score(applicant_profile(applicant))
+                if match_score > 30:
+                    rows.append({"applicant_id": applicant_id, "job_id": job.id, "match_score": match_score})
                 else:
-                    gaps.append(f"Education below requirements ({applicant.education_level} vs required {requirements.min_education_level})")
-        
-        # Experience analysis
-        if applicant.experience_years > requirements.min_experience_years:
-            strengths.append(f"Experience exceeds requirements ({applicant.experience_years} years vs required {requirements.min_experience_years})")
-        elif applicant.experience_years == requirements.min_experience_years:
-            strengths.append(f"Experience matches requirements ({applicant.experience_years} years)")
-        else:
-            gaps.append(f"Experience below requirements ({applicant.experience_years} years vs required {requirements.min_experience_years})")
-        
-        # Skills analysis
-        required_skills = job.required_skills
-        if required_skills:
-            # Get applicant skills
-            applicant_skill_names = [skill.name for skill in applicant.skills]
-            required_skill_names = [skill.name for skill in required_skills]
-            
-            # Find matched and missing skills
-            matched_skills = [skill for skill in required_skill_names if skill in applicant_skill_names]
-            missing_skills = [skill for skill in required_skill_names if skill not in applicant_skill_names]
-            
-            if matched_skills:
-                strengths.append(f"Matches {len(matched_skills)} of {len(required_skills)} required skills: {', '.join(matched_skills)}")
-            
-            if missing_skills:
-                gaps.append(f"Missing {len(missing_skills)} required skills: {', '.join(missing_skills)}")
-        
-        # Location analysis
-        if requirements.location_preference:
-            if requirements.location_preference in applicant.location or applicant.location in requirements.location_preference:
-                strengths.append(f"Location matches preference ({applicant.location})")
-            elif applicant.willing_to_relocate and requirements.relocation_required:
-                strengths.append("Willing to relocate as required")
-            elif requirements.relocation_required and not applicant.willing_to_relocate:
-                gaps.append("Not willing to relocate as required")
-            else:
-                gaps.append(f"Location ({applicant.location}) does not match preference ({requirements.location_preference})")
-        
-        # Salary analysis
-        if requirements.min_salary and requirements.max_salary:
-            if applicant.desired_salary >= requirements.min_salary and applicant.desired_salary <= requirements.max_salary:
-                strengths.append(f"Salary expectation (${applicant.desired_salary:,}) within budget range (${requirements.min_salary:,} - ${requirements.max_salary:,})")
-            elif applicant.desired_salary < requirements.min_salary:
-                strengths.append(f"Salary expectation (${applicant.desired_salary:,}) below budget minimum (${requirements.min_salary:,})")
-            else:
-                gaps.append(f"Salary expectation (${applicant.desired_salary:,}) above budget maximum (${requirements.max_salary:,})")
-        
-        return {"strengths": strengths, "gaps": gaps}
+                    stale.append(applicant_id)
+            self._delete_matches(ApplicantMatch.job_id == job.id, ApplicantMatch.applicant_id, stale)
+            self._save_matches(rows)
+            self.session.commit()
+            last_id = new_ids[-1]
     
-    def _generate_match_analysis_from_requirements(self, applicant, requirements):
-        """Generate analysis of match strengths and gaps from requirements dictionary"""
-        strengths = []
-        gaps = []
-        
-        # Education analysis
-        if requirements.get('educationLevel'):
-            education_levels = ['High School', 'Associate\'s', 'Bachelor\'s', 'Master\'s', 'PhD']
-            req_education_index = education_levels.index(requirements['educationLevel']) if requirements['educationLevel'] in education_levels else -1
-            app_education_index = education_levels.index(applicant.education_level) if applicant.education_level in education_levels else -1
-            
-            if req_education_index != -1 and app_education_index != -1:
-                if app_education_index > req_education_index:
-                    strengths.append(f"Education exceeds requirements ({applicant.education_level} vs required {requirements['educationLevel']})")
-                elif app_education_index == req_education_index:
-                    strengths.append(f"Education matches requirements ({applicant.education_level})")
-                else:
-                    gaps.append(f"Education below requirements ({applicant.education_level} vs required {requirements['educationLevel']})")
-        
-        # Experience analysis
-        if requirements.get('experienceYears') is not None:
-            if applicant.experience_years > requirements['experienceYears']:
-                strengths.append(f"Experience exceeds requirements ({applicant.experience_years} years vs required {requirements['experienceYears']})")
-            elif applicant.experience_years == requirements['experienceYears']:
-                strengths.append(f"Experience matches requirements ({applicant.experience_years} years)")
+    def refresh_applicant_matches(self, applicant_id):
+        """Recompute the stored matches of one applicant for every job whose matches are stored
+        
+        Every job is scored at once through the job index; jobs added since the
+        index was built are scored one by one.
+        """
+        applicant = load_applicant_record(self.session, applicant_id)
+        if not applicant:
+            return
+        
+        stored = np.array(self.session.execute(select(JobMatchStatus.job_id)).scalars().all(), dtype=np.int64)
+        profile = applicant_profile(applicant)
+        index = get_job_index(self.session)
+        indexed = np.isin(index.ids, stored)
+        job_ids = index.ids[indexed].tolist()
+        scores = index.score_profile(profile)[indexed].tolist()
+        unindexed = np.setdiff1d(stored, index.ids).tolist()
+        if unindexed:
+            for job in self.session.query(JobPosition).options(*JOB_EAGER_LOAD).filter(JobPosition.id.in_(unindexed)):
+                job_ids.append(job.id)
+                scores.append(RequirementPlan.from_job(job).score(profile))
+        
+        rows = []
+        stale = []
+        for job_id, match_score in zip(job_ids, scores):
+            if match_score > 30:
+                rows.append({"applicant_id": applicant.id, "job_id": job_id, "match_score": match_score})
             else:
-                gaps.append(f"Experience below requirements ({applicant.experience_years} years vs required {requirements['experienceYears']})")
+                stale.append(job_id)
         
-        # Skills analysis
-        if requirements.get('requiredSkills'):
-            # Get applicant skills
-            applicant_skills = [skill.name for skill in applicant.skills]
-            
-            # Find matched and missing skills
-            matched_skills = [skill for skill in requirements['requiredSkills'] if skill in applicant_skills]
-            missing_skills = [skill for skill in requirements['requiredSkills'] if skill not in applicant_skills]
-            
-            if matched_skills:
-                strengths.append(f"Matches {len(matched_skills)} of {len(requirements['requiredSkills'])} required skills: {', '.join(matched_skills)}")
-            
-            if missing_skills:
-                gaps.append(f"Missing {len(missing_skills)} required skills: {', '.join(missing_skills)}")
-        
-        # Preferred skills analysis
-        if requirements.get('preferredSkills'):
-            # Get applicant skills
-            applicant_skills = [skill.name for skill in applicant.skills]
-            
-            # Find matched preferred skills
-            matched_skills = [skill for skill in requirements['preferredSkills'] if skill in applicant_skills]
-            
-            if matched_skills:
-                strengths.append(f"Matches {len(matched_skills)} of {len(requirements['preferredSkills'])} preferred skills: {', '.join(matched_skills)}")
-        
-        # Location analysis
-        if requirements.get('locationPreference'):
-            if requirements['locationPreference'] in applicant.location or applicant.location in requirements['locationPreference']:
-                strengths.append(f"Location matches preference ({applicant.location})")
-            elif applicant.willing_to_relocate and requirements.get('relocationRequired'):
-                strengths.append("Willing to relocate as required")
-            elif requirements.get('relocationRequired') and not applicant.willing_to_relocate:
-                gaps.append("Not willing to relocate as required")
-            else:
-                gaps.append(f"Location ({applicant.location}) does not match preference ({requirements['locationPreference']})")
-        
-        # Salary analysis
-        if requirements.get('minSalary') is not None and requirements.get('maxSalary') is not None:
-            if applicant.desired_salary >= requirements['minSalary'] and applicant.desired_salary <= requirements['maxSalary']:
-                strengths.append(f"Salary expectation (${applicant.desired_salary:,}) within budget range (${requirements['minSalary']:,} - ${requirements['maxSalary']:,})")
-            elif applicant.desired_salary < requirements['minSalary']:
-                strengths.append(f"Salary expectation (${applicant.desired_salary:,}) below budget minimum (${requirements['minSalary']:,})")
-            else:
-                gaps.append(f"Salary expectation (${applicant.desired_salary:,}) above budget maximum (${requirements['maxSalary']:,})")
-        
-        return {"strengths": strengths, "gaps": gaps}
+        self._delete_matches(ApplicantMatch.applicant_id == applicant.id, ApplicantMatch.job_id, stale)
+        self._save_matches(rows)
+        self.session.commit()
+    
+    def _build_matches(self, page, analyze=None, stream=False):
+        """Load the applicants of a page of (applicant_id, match_score) pairs
+        
+        analyze, when given, is called with each applicant on the page to build its match analysis.
+        With stream set an iterator is returned instead of a list.
+        """
+        if stream:
+            # Smaller chunks get the first matches out sooner
+            return self._iter_matches(page, analyze, chunk_size=100)
+        return list(self._iter_matches(page, analyze))
     
-    def _save_match(self, applicant_id, job_id, match_score):
-        """Save match to database"""
-        # Check if match already exists
-        existing_match = self.session.query(ApplicantMatch).filter(
-            ApplicantMatch.applicant_id == applicant_id,
-            ApplicantMatch.job_id == job_id
-        ).first()
-        
-        if existing_match:
-            # Update existing match
-            existing_match.match_score = match_score
+    def _iter_matches(self, page, analyze=None, chunk_size=500):
+        """Yield the matches of a page in order, loading applicants one chunk at a time
+        
+        Applicants are read-only ApplicantRecords, which the session does not
+        track, so a chunk can be freed once its matches have been consumed.
+        """
+        for start in range(0, len(page), chunk_size):
+            chunk = page[start:start + chunk_size]
+            applicants = self._load_applicants([applicant_id for applicant_id, _ in chunk])
+            for applicant_id, match_score in chunk:
+                applicant = applicants[applicant_id]
+                yield {
+                    "applicant": applicant,
+                    "match_score": match_score,
+                    "match_analysis": analyze(applicant) if analyze else None
+                }
+    
+    @staticmethod
+    def _select_scored_page(applicant_ids, scores, limit, offset):
+        """Return one page of (applicant_id, match_score) pairs from arrays in applicant order
+        
+        Pairs are ordered by score (descending), ties kept in applicant order. With
+        a limit only the best offset + limit pairs are sorted, after a partition.
+        """
+        count = len(scores)
+        stop = count if limit is None else min(offset + limit, count)
+        if offset >= stop:
+            return []
+        
+        # One sort key: higher scores first, then earlier positions
+        order_key = (100 - scores.astype(np.int64)) * count + np.arange(count)
+        if stop < count:
+            best = np.argpartition(order_key, stop - 1)[:stop]
+            best = best[np.argsort(order_key[best])]
         else:
-            # Create new match
-            match = ApplicantMatch(
-                applicant_id=applicant_id,
-                job_id=job_id,
-                match_score=match_score
+            best = np.argsort(order_key)
+        best = best[offset:stop]
+        return list(zip(applicant_ids[best].tolist(), scores[best].tolist()))
+    
+    def _load_applicants(self, applicant_ids, chunk_size=500):
+        """Load ApplicantRecords (with skills and certifications) by id, in chunks to stay under bind parameter limits"""
+        return load_applicant_records(self.session, applicant_ids, chunk_size)
+    
+    def _save_matches(self, rows):
+        """Upsert applicant_matches rows (applicant_id, job_id, match_score) in a single statement"""
+        self._upsert(
+            ApplicantMatch.__table__, rows, ['applicant_id', 'job_id'],
+            {"match_score": "match_score", "match_date": func.now()}
+        )
+    
+    def _delete_matches(self, criterion, column, values, chunk_size=500):
+        """Delete applicant_matches rows matching criterion whose column is in values"""
+        for start in range(0, len(values), chunk_size):
+            self.session.query(ApplicantMatch).filter(
+                criterion, column.in_(values[start:start + chunk_size])
+            ).delete(synchronize_session=False)
+    
+    def _upsert(self, table, rows, index_elements, updates):
+        """Insert rows into table, updating the existing row on a conflict over index_elements
+        
+        updates maps column names to either the name of an inserted column (copied
+        from the conflicting insert) or a SQL expression.
+        """
+        if not rows:
+            return
+        
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={
+                    column: statement.excluded[value] if isinstance(value, str) else value
+                    for column, value in updates.items()
+                }
             )
-            self.session.add(match)
-        
-        self.session.commit()
+            self.session.execute(statement, rows)
+        else:
+            # Generic fallback for other databases
+            for row in rows:
+                key = [table.c[column] == row[column] for column in index_elements]
+                values = {
+                    column: row[value] if isinstance(value, str) else value
+                    for column, value in updates.items()
+                }
+                if not self.session.execute(table.update().where(*key).values(**values)).rowcount:
+                    self.session.execute(table.insert().values(**row))
@@ -0,0 +1,104 @@
+"""
+Sharded match scoring across worker processes for large applicant pools
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Number of scoring processes per application worker; below 2 everything is scored in-process
+PARALLEL_WORKERS = int(os.getenv('MATCH_PARALLEL_WORKERS', '0'))
+
+# Smallest number of candidate applicants worth splitting across processes
+PARALLEL_THRESHOLD = int(os.getenv('MATCH_PARALLEL_THRESHOLD', '250000'))
+
+# Worker process side: (token, ApplicantIndex slice) last received by this process
+_shard = None
+
+def _score_shard(token, shard, plan, rows):
+    """Score a plan against this process's shard, storing shard first when it is sent
+
+    Returns None when no shard is sent and the stored one does not match token.
+    """
+    global _shard
+    if shard is not None:
+        _shard = (token, shard)
+    elif _shard is None or _shard[0] != token:
+        return None
+    return _shard[1].score_plan(plan, rows)
+
+class ShardedScorer:
+    """Scores an ApplicantIndex in contiguous row shards, one worker process per shard
+
+    Shard i always goes to the same single-process executor, which keeps its
+    copy of the shard between requests, so a shard is only shipped again after
+    the index changed. Shard scores are concatenated in row order, which gives
+    exactly the array ApplicantIndex.score_plan returns in-process.
+    """
+
+    def __init__(self, workers):
+        # Spawned workers do not inherit the parent's database connections or locks
+        context = multiprocessing.get_context('spawn')
+        self._executors = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(workers)]
+        self._sent = [None] * workers  # shard token each worker holds
+        self._lock = threading.Lock()
+
+    def score(self, index, plan, rows=None):
+        """Score every applicant, or only the given index rows, like ApplicantIndex.score_plan"""
+        with self._lock:
+            with index.lock:
+                bounds = index.shard_bounds(len(self._executors))
+                version = index.version
+
+            jobs = []
+            for number, (start, stop) in enumerate(bounds):
+                token = (version, start, stop)
+                if rows is None:
+                    local_rows = None
+                else:
+                    local_rows = rows[(rows >= start) & (rows < stop)] - start
+                shard = None if self._sent[number] == token else index.slice(start, stop)
+                future = self._executors[number].submit(_score_shard, token, shard, plan, local_rows)
+                jobs.append((number, token, start, stop, local_rows, future))
+
+            results = []
+            for number, token, start, stop, local_rows, future in jobs:
+                scores = future.result()
+                if scores is None:
+                    # The worker lost its shard (e.g. it was restarted); send it again
+                    scores = self._executors[number].submit(
+                        _score_shard, token, index.slice(start, stop), plan, local_rows
+                    ).result()
+                self._sent[number] = token
+                results.append(scores)
+
+        if not results:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(results)
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Process-wide scorer, started on first use
+_scorer = None
+_scorer_lock = threading.Lock()
+
+def get_sharded_scorer(candidates):
+    """Return the shared ShardedScorer when scoring this many candidates is worth parallelizing, else None"""
+    global _scorer
+    if PARALLEL_WORKERS < 2 or candidates < PARALLEL_THRESHOLD:
+        return None
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = ShardedScorer(PARALLEL_WORKERS)
+        return _scorer
+
+def reset_sharded_scorer():
+    """Drop the shared scorer (e.g. after a worker process died) so the next use starts a new one"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is not None:
+            _scorer.shutdown()
+            _scorer = None
@@ -0,0 +1,280 @@
+"""
+Requirement plans: job or ad-hoc requirements compiled once for scoring many applicants
+"""
+import hashlib
+import json
+from collections import namedtuple
+from .index import education_rank
+
+# Compact applicant record scored by a plan, with skills and certifications as catalog id sets
+ApplicantProfile = namedtuple('ApplicantProfile', [
+    'id', 'education_rank', 'experience_years', 'desired_salary',
+    'willing_to_relocate', 'location', 'skill_ids', 'cert_ids'
+])
+
+def applicant_profile(applicant):
+    """Build the ApplicantProfile of an ApplicantRecord (or an Applicant with skills and certifications loaded)"""
+    return ApplicantProfile(
+        id=applicant.id,
+        education_rank=education_rank(applicant.education_level),
+        experience_years=applicant.experience_years or 0,
+        desired_salary=applicant.desired_salary,
+        willing_to_relocate=bool(applicant.willing_to_relocate),
+        location=applicant.location,
+        skill_ids=frozenset(skill.id for skill in applicant.skills),
+        cert_ids=frozenset(cert.id for cert in applicant.certifications)
+    )
+
+class RequirementPlan:
+    """Scoring criteria resolved once: education rank, catalog ids and salary bounds
+
+    A criterion set to None is not scored. Skill and certification lists keep
+    their requested length, which scores divide by, while only names present in
+    the catalog are resolved to ids. Display values (names, levels, raw numbers)
+    are kept for the match analysis.
+    """
+
+    def __init__(self, education_level=None, education_rank=None, min_experience=None,
+                 required_skill_names=(), required_skill_ids=(),
+                 preferred_skill_names=(), preferred_skill_ids=(),
+                 required_cert_count=0, required_cert_ids=(),
+                 location_preference=None, relocation_required=False,
+                 min_salary=None, max_salary=None):
+        self.education_level = education_level
+        self.education_rank = education_rank  # -1 means every applicant gets the education points
+        self.min_experience = min_experience
+        self.required_skill_names = list(required_skill_names)
+        self.required_skill_ids = list(required_skill_ids)
+        self.preferred_skill_names = list(preferred_skill_names)
+        self.preferred_skill_ids = list(preferred_skill_ids)
+        self.required_cert_count = required_cert_count
+        self.required_cert_ids = list(required_cert_ids)
+        self.location_preference = location_preference or None
+        self.relocation_required = bool(relocation_required)
+        self.min_salary = min_salary
+        self.max_salary = max_salary
+
+        # Points at stake, and how many of them depend on skills and certifications
+        self.skill_points = 0
+        if self.required_skill_names:
+            self.skill_points += 30
+        if self.preferred_skill_names:
+            self.skill_points += 10
+        if self.required_cert_count:
+            self.skill_points += 10
+        self.max_score = self.skill_points
+        if self.education_rank is not None:
+            self.max_score += 20
+        if self.min_experience is not None:
+            self.max_score += 20
+        if self.location_preference:
+            self.max_score += 5
+        if self.has_salary_range:
+            self.max_score += 5
+
+    @classmethod
+    def from_job(cls, job):
+        """Compile the requirements of a job position (requirements, skills and certifications loaded)"""
+        requirements = job.requirements
+        has_salary_range = bool(requirements.min_salary and requirements.max_salary)
+        return cls(
+            # Education and experience always count for jobs; without a level everyone gets the points
+            education_level=requirements.min_education_level,
+            education_rank=education_rank(requirements.min_education_level) if requirements.min_education_level else -1,
+            min_experience=requirements.min_experience_years or 0,
+            required_skill_names=[skill.name for skill in job.required_skills],
+            required_skill_ids=[skill.id for skill in job.required_skills],
+            required_cert_count=len(job.required_certifications),
+            required_cert_ids=[cert.id for cert in job.required_certifications],
+            location_preference=requirements.location_preference,
+            relocation_required=requirements.relocation_required,
+            min_salary=requirements.min_salary if has_salary_range else None,
+            max_salary=requirements.max_salary if has_salary_range else None
+        )
+
+    @classmethod
+    def from_requirements(cls, requirements, index):
+        """Compile a requirements dictionary, resolving names through the applicant index catalog"""
+        has_salary_range = requirements.get('minSalary') is not None and requirements.get('maxSalary') is not None
+        required_skills = requirements.get('requiredSkills') or []
+        preferred_skills = requirements.get('preferredSkills') or []
+        required_certs = requirements.get('requiredCertifications') or []
+        return cls(
+            education_level=requirements.get('educationLevel') or None,
+            education_rank=education_rank(requirements['educationLevel']) if requirements.get('educationLevel') else None,
+            min_experience=requirements.get('experienceYears'),
+            required_skill_names=required_skills,
+            required_skill_ids=index.skill_ids_for(required_skills),
+            preferred_skill_names=preferred_skills,
+            preferred_skill_ids=index.skill_ids_for(preferred_skills),
+            required_cert_count=len(required_certs),
+            required_cert_ids=index.cert_ids_for(required_certs),
+            location_preference=requirements.get('locationPreference'),
+            relocation_required=requirements.get('relocationRequired'),
+            min_salary=requirements['minSalary'] if has_salary_range else None,
+            max_salary=requirements['maxSalary'] if has_salary_range else None
+        )
+
+    @property
+    def has_salary_range(self):
+        return self.min_salary is not None and self.max_salary is not None
+
+    def component_keys(self):
+        """Canonical value of each scored criterion (None when not scored), keyed like index.COMPONENTS
+
+        Skill and certification ids are sorted (with the list length, which scores
+        divide by), so plans differing only in list order or in names no applicant
+        holds give equal keys. Names are not case-folded because scoring compares them exactly.
+        """
+        def catalog_ids(count, ids):
+            return [count, sorted(ids)] if count else None
+
+        return {
+            "education": self.education_rank,
+            "experience": float(self.min_experience) if self.min_experience is not None else None,
+            "required_skills": catalog_ids(len(self.required_skill_names), self.required_skill_ids),
+            "preferred_skills": catalog_ids(len(self.preferred_skill_names), self.preferred_skill_ids),
+            "certifications": catalog_ids(self.required_cert_count, self.required_cert_ids),
+            "location": [self.location_preference, self.relocation_required] if self.location_preference else None,
+            "salary": [float(self.min_salary), float(self.max_salary)] if self.has_salary_range else None,
+        }
+
+    def cache_key(self, must_have=None):
+        """Canonical key of the criteria that affect scores, plus any must-have filter"""
+        canonical = dict(self.component_keys(), mustHave=must_have)
+        return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def only_related_can_pass(self, cutoff=30):
+        """Whether applicants sharing no requested skill or certification are certain to miss the cutoff"""
+        if self.max_score == 0:
+            return True
+        return round(((self.max_score - self.skill_points) / self.max_score) * 100) <= cutoff
+
+    def related_skill_ids(self):
+        """Catalog ids of every requested skill, required or preferred"""
+        return self.required_skill_ids + self.preferred_skill_ids
+
+    def location_matches(self, location):
+        """Whether an applicant location matches the location preference"""
+        return location is not None and (self.location_preference in location or location in self.location_preference)
+
+    def score(self, profile):
+        """Score one ApplicantProfile; agrees exactly with ApplicantIndex.score_plan"""
+        score = 0
+
+        # Education match (worth 20 points)
+        if self.education_rank is not None:
+            if self.education_rank == -1 or profile.education_rank >= self.education_rank:
+                score += 20
+
+        # Experience match (worth 20 points)
+        if self.min_experience is not None and profile.experience_years >= self.min_experience:
+            exp_ratio = min(profile.experience_years / max(self.min_experience, 1), 2)
+            score += min(20, 10 + 5 * exp_ratio)
+
+        # Required skills match (worth 30 points)
+        if self.required_skill_names:
+            matched = sum(1 for skill_id in self.required_skill_ids if skill_id in profile.skill_ids)
+            score += 30 * (matched / len(self.required_skill_names))
+
+        # Preferred skills match (worth 10 points)
+        if self.preferred_skill_names:
+            matched = sum(1 for skill_id in self.preferred_skill_ids if skill_id in profile.skill_ids)
+            score += 10 * (matched / len(self.preferred_skill_names))
+
+        # Certifications match (worth 10 points)
+        if self.required_cert_count:
+            matched = sum(1 for cert_id in self.required_cert_ids if cert_id in profile.cert_ids)
+            score += 10 * (matched / self.required_cert_count)
+
+        # Location match (worth 5 points)
+        if self.location_preference:
+            if self.location_matches(profile.location):
+                score += 5
+            elif profile.willing_to_relocate and self.relocation_required:
+                score += 3
+
+        # Salary match (worth 5 points)
+        if self.has_salary_range and profile.desired_salary is not None:
+            if self.min_salary <= profile.desired_salary <= self.max_salary:
+                score += 5
+            else:
+                salary_diff = min(
+                    abs(profile.desired_salary - self.min_salary),
+                    abs(profile.desired_salary - self.max_salary)
+                )
+                salary_ratio = max(0, 1 - (salary_diff / self.max_salary)) if self.max_salary else 0
+                score += 5 * salary_ratio
+
+        # Calculate final percentage
+        return round((score / self.max_score) * 100) if self.max_score > 0 else 0
+
+    def analyze(self, applicant):
+        """Generate analysis of match strengths and gaps for an ApplicantRecord (or Applicant)"""
+        strengths = []
+        gaps = []
+
+        # Education analysis
+        if self.education_level:
+            req_education_index = education_rank(self.education_level)
+            app_education_index = education_rank(applicant.education_level)
+
+            if req_education_index != -1 and app_education_index != -1:
+                if app_education_index > req_education_index:
+                    strengths.append(f"Education exceeds requirements ({applicant.education_level} vs required {self.education_level})")
+                elif app_education_index == req_education_index:
+                    strengths.append(f"Education matches requirements ({applicant.education_level})")
+                else:
+                    gaps.append(f"Education below requirements ({applicant.education_level} vs required {self.education_level})")
+
+        # Experience analysis
+        if self.min_experience is not None:
+            experience_years = applicant.experience_years or 0
+            if experience_years > self.min_experience:
+                strengths.append(f"Experience exceeds requirements ({experience_years} years vs required {self.min_experience})")
+            elif experience_years == self.min_experience:
+                strengths.append(f"Experience matches requirements ({experience_years} years)")
+            else:
+                gaps.append(f"Experience below requirements ({experience_years} years vs required {self.min_experience})")
+
+        applicant_skills = {skill.name for skill in applicant.skills}
+
+        # Skills analysis
+        if self.required_skill_names:
+            matched_skills = [skill for skill in self.required_skill_names if skill in applicant_skills]
+            missing_skills = [skill for skill in self.required_skill_names if skill not in applicant_skills]
+
+            if matched_skills:
+                strengths.append(f"Matches {len(matched_skills)} of {len(self.required_skill_names)} required skills: {', '.join(matched_skills)}")
+
+            if missing_skills:
+                gaps.append(f"Missing {len(missing_skills)} required skills: {', '.join(missing_skills)}")
+
+        # Preferred skills analysis
+        if self.preferred_skill_names:
+            matched_skills = [skill for skill in self.preferred_skill_names if skill in applicant_skills]
+
+            if matched_skills:
+                strengths.append(f"Matches {len(matched_skills)} of {len(self.preferred_skill_names)} preferred skills: {', '.join(matched_skills)}")
+
+        # Location analysis
+        if self.location_preference:
+            if self.location_matches(applicant.location):
+                strengths.append(f"Location matches preference ({applicant.location})")
+            elif applicant.willing_to_relocate and self.relocation_required:
+                strengths.append("Willing to relocate as required")
+            elif self.relocation_required and not applicant.willing_to_relocate:
+                gaps.append("Not willing to relocate as required")
+            else:
+                gaps.append(f"Location ({applicant.location}) does not match preference ({self.location_preference})")
+
+        # Salary analysis
+        if self.has_salary_range and applicant.desired_salary is not None:
+            if applicant.desired_salary >= self.min_salary and applicant.desired_salary <= self.max_salary:
+                strengths.append(f"Salary expectation (${applicant.desired_salary:,}) within budget range (${self.min_salary:,} - ${self.max_salary:,})")
+            elif applicant.desired_salary < self.min_salary:
+                strengths.append(f"Salary expectation (${applicant.desired_salary:,}) below budget minimum (${self.min_salary:,})")
+            else:
+                gaps.append(f"Salary expectation (${applicant.desired_salary:,}) above budget maximum (${self.max_salary:,})")
+
+        return {"strengths": strengths, "gaps": gaps}
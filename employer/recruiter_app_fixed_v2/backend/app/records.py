@@ -0,0 +1,61 @@
+"""
+Read-only applicant records: what the match and listing responses show, without ORM instances
+"""
+from collections import namedtuple
+from sqlalchemy import select
+from ..models.models import Applicant, Skill, Certification, applicant_skill, applicant_certification
+
+# A skill or certification held by an applicant
+CatalogRef = namedtuple('CatalogRef', ['id', 'name'])
+
+# Applicant columns read by the match path and the API serializers
+APPLICANT_COLUMNS = (
+    'id', 'name', 'email', 'phone', 'education_level', 'institution', 'major',
+    'experience_years', 'current_position', 'current_company', 'location',
+    'willing_to_relocate', 'desired_salary'
+)
+
+# Immutable applicant with skills and certifications as tuples of CatalogRef. It
+# has the attributes of a loaded Applicant that scoring, analysis and the
+# serializers read, so it can stand in for one anywhere nothing is written
+ApplicantRecord = namedtuple('ApplicantRecord', APPLICANT_COLUMNS + ('skills', 'certifications'))
+
+def _held(session, table, column, model, applicant_ids):
+    """applicant_id -> tuple of CatalogRef, from one association table"""
+    query = select(table.c.applicant_id, model.id, model.name).join(model, model.id == table.c[column])
+    if applicant_ids is not None:
+        query = query.where(table.c.applicant_id.in_(applicant_ids))
+    held = {}
+    for applicant_id, catalog_id, name in session.execute(query):
+        held.setdefault(applicant_id, []).append(CatalogRef(catalog_id, name))
+    return {applicant_id: tuple(refs) for applicant_id, refs in held.items()}
+
+def _load_chunk(session, applicant_ids):
+    """ApplicantRecords for applicant_ids (every applicant when None), in query order"""
+    query = select(*[getattr(Applicant, name) for name in APPLICANT_COLUMNS])
+    if applicant_ids is not None:
+        query = query.where(Applicant.id.in_(applicant_ids))
+    skills = _held(session, applicant_skill, 'skill_id', Skill, applicant_ids)
+    certifications = _held(session, applicant_certification, 'certification_id', Certification, applicant_ids)
+    return [
+        ApplicantRecord(*row, skills.get(row.id, ()), certifications.get(row.id, ()))
+        for row in session.execute(query)
+    ]
+
+def load_applicant_records(session, applicant_ids=None, chunk_size=500):
+    """Load ApplicantRecords by id (every applicant when applicant_ids is None) as a dict keyed by id
+
+    Ids are queried in chunks to stay under bind parameter limits. Three plain
+    SELECTs per chunk replace the ORM's identity map and eager loads.
+    """
+    if applicant_ids is None:
+        return {record.id: record for record in _load_chunk(session, None)}
+    records = {}
+    for start in range(0, len(applicant_ids), chunk_size):
+        for record in _load_chunk(session, list(applicant_ids[start:start + chunk_size])):
+            records[record.id] = record
+    return records
+
+def load_applicant_record(session, applicant_id):
+    """The ApplicantRecord of one applicant, or None when it does not exist"""
+    return load_applicant_records(session, [applicant_id]).get(applicant_id)
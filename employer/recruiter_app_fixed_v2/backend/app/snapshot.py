@@ -0,0 +1,161 @@
+"""
+Applicant index snapshots: one binary file memory-mapped by every worker process
+"""
+import fcntl
+import json
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+import numpy as np
+from .index import ApplicantIndex
+
+# Snapshot file shared by the application workers; empty keeps a private index per worker
+SNAPSHOT_PATH = os.getenv('MATCH_SNAPSHOT_PATH', '')
+
+# File layout: magic, format version, header length, JSON header, then 64-byte aligned arrays
+MAGIC = b'RECRSNAP'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sQQ')
+_ALIGNMENT = 64
+
+def _aligned(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+def write_snapshot(index, path, generation):
+    """Write the index to path, replacing any previous snapshot atomically
+
+    The file is written next to path and renamed over it, so readers see either
+    the old or the new snapshot, and workers still mapping the old file keep a
+    consistent view until they reopen.
+    """
+    meta, arrays = index.to_arrays()
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Lay out the arrays after the header, which records where each one starts
+    layout = {}
+    header = b''
+    while True:  # The header size depends on the offsets it records
+        offset = _aligned(_PREAMBLE.size + len(header))
+        for name, array in arrays.items():
+            layout[name] = [offset, array.dtype.str, list(array.shape)]
+            offset = _aligned(offset + array.nbytes)
+        encoded = json.dumps({'generation': generation, 'meta': meta, 'arrays': layout}).encode('utf-8')
+        encoded += b' ' * (_aligned(_PREAMBLE.size + len(encoded)) - _PREAMBLE.size - len(encoded))
+        if len(encoded) == len(header):
+            header = encoded
+            break
+        header = encoded
+
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary, 'wb') as snapshot:
+            snapshot.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            snapshot.write(header)
+            for name, array in arrays.items():
+                snapshot.seek(layout[name][0])
+                snapshot.write(memoryview(array.reshape(-1).view(np.uint8)))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+def read_snapshot(path):
+    """Open a snapshot as a read-only ApplicantIndex whose arrays are views of the mapped file
+
+    Raises ValueError when the file is not a snapshot of the current format.
+    """
+    with open(path, 'rb') as snapshot:
+        status = os.fstat(snapshot.fileno())
+        mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mapped) < _PREAMBLE.size:
+        raise ValueError(f"{path} is not an applicant snapshot")
+    magic, format_version, header_length = _PREAMBLE.unpack_from(mapped)
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not an applicant snapshot of format {FORMAT_VERSION}")
+    header = json.loads(mapped[_PREAMBLE.size:_PREAMBLE.size + header_length])
+
+    arrays = {}
+    for name, (offset, dtype, shape) in header['arrays'].items():
+        count = int(np.prod(shape))
+        if count:
+            arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=offset).reshape(shape)
+        else:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+
+    index = ApplicantIndex.from_arrays(header['meta'], arrays)
+    index.generation = header['generation']
+    index.snapshot_identity = _identity(status)
+    return index
+
+def _identity(status):
+    """What changes whenever the snapshot file is replaced"""
+    return (status.st_dev, status.st_ino, status.st_mtime_ns)
+
+def _file_identity(path):
+    """Identity of the snapshot currently at path, or None when there is none"""
+    try:
+        return _identity(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+@contextmanager
+def _writer_lock(path):
+    """Exclusive lock held by the one process writing a new snapshot"""
+    with open(f'{path}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_current(path):
+    """The snapshot at path, or None when it is missing or of another format"""
+    try:
+        return read_snapshot(path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def publish_snapshot(session, path=SNAPSHOT_PATH):
+    """Bring the snapshot up to date with the committed applicants and return it
+
+    Applicants added since the last snapshot are appended to it; when they
+    cannot be appended in id order or the applicant count does not add up, the
+    snapshot is rebuilt from the database instead.
+    """
+    with _writer_lock(path):
+        current = _read_current(path)
+        index = current
+        if index is not None:
+            added = index.catch_up(session)
+            if added == 0:
+                return current  # Already current, e.g. published by another worker meanwhile
+            if added is None:
+                index = None
+        if index is None:
+            index = ApplicantIndex(session)
+
+        generation = current.generation + 1 if current is not None else 1
+        write_snapshot(index, path, generation)
+        return read_snapshot(path)
+
+def current_snapshot(session, index, path=SNAPSHOT_PATH):
+    """Return index if it maps the current snapshot, else the current snapshot (publishing one if missing)"""
+    identity = _file_identity(path)
+    if index is not None and identity is not None and getattr(index, 'snapshot_identity', None) == identity:
+        return index
+
+    fresh = _read_current(path) if identity is not None else None
+    if fresh is None:
+        fresh = publish_snapshot(session, path)
+    return fresh
+
+def discard_snapshot(path=SNAPSHOT_PATH):
+    """Remove the snapshot so the next match request in any worker rebuilds it from the database"""
+    with _writer_lock(path):
+        if os.path.exists(path):
+            os.remove(path)
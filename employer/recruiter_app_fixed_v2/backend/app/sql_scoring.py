@@ -0,0 +1,223 @@
+"""
+Database-side match scoring: a RequirementPlan expressed as one SQL query
+"""
+import numpy as np
+from sqlalchemy import Float, Integer, and_, case, cast, desc, func, literal, select
+from ..models.models import Applicant, Skill, Certification, applicant_skill, applicant_certification
+from .index import EDUCATION_LEVELS, int_array, scan_rows
+
+def _real(value):
+    """A numeric constant typed as double precision, so no integer or numeric arithmetic creeps in"""
+    return cast(literal(float(value)), Float)
+
+def _least(a, b):
+    """min(a, b) with Python's result on ties"""
+    return case((b < a, b), else_=a)
+
+def _greatest(a, b):
+    """max(a, b) with Python's result on ties"""
+    return case((b > a, b), else_=a)
+
+class SqlCatalog:
+    """Resolves skill and certification names to ids in the database, like ApplicantIndex.skill_ids_for"""
+
+    def __init__(self, session):
+        self.session = session
+
+    def _ids_for(self, model, names):
+        if not names:
+            return []
+        ids = dict(self.session.execute(select(model.name, model.id).where(model.name.in_(set(names)))).all())
+        return [ids[name] for name in names if name in ids]
+
+    def skill_ids_for(self, names):
+        return self._ids_for(Skill, names)
+
+    def cert_ids_for(self, names):
+        return self._ids_for(Certification, names)
+
+class SqlScorer:
+    """Scores applicants against a RequirementPlan inside the database
+
+    Every component is computed in double precision and added in the same order
+    as RequirementPlan.score, and the final percentage is rounded half to even
+    like Python's round, so scores agree exactly with the in-memory scorers.
+    Only (applicant_id, match_score) rows above the cutoff leave the database.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.dialect = session.get_bind().dialect.name
+
+    def _contains(self, haystack, needle):
+        """Case-sensitive substring test (Python's `needle in haystack`)"""
+        if self.dialect == 'postgresql':
+            return func.strpos(haystack, needle) > 0
+        return func.instr(haystack, needle) > 0
+
+    def _floor_int(self, value):
+        """Integer part of a non-negative double"""
+        if self.dialect == 'postgresql':
+            # Casting a double to integer rounds in PostgreSQL, so floor first
+            return cast(func.floor(value), Integer)
+        return cast(value, Integer)
+
+    def _matched(self, table, column, catalog_ids):
+        """Subquery of (applicant_id, matched) counting held catalog ids, repeated ids counting each time"""
+        multiplicity = {}
+        for catalog_id in catalog_ids:
+            multiplicity[catalog_id] = multiplicity.get(catalog_id, 0) + 1
+        held = select(table.c.applicant_id, table.c[column]).where(
+            table.c[column].in_(list(multiplicity))
+        ).distinct().subquery()
+        return select(
+            held.c.applicant_id,
+            func.sum(case(
+                *[(held.c[column] == catalog_id, count) for catalog_id, count in multiplicity.items()],
+                else_=0
+            )).label('matched')
+        ).group_by(held.c.applicant_id).subquery()
+
+    def scores_query(self, plan, clauses=()):
+        """SELECT of (applicant_id, match_score) for applicants above the cutoff meeting clauses
+
+        Built in layers (inputs, component sum, percentage, rounding) so every
+        intermediate value is written once in the SQL.
+        """
+        # Inputs: applicant columns as doubles and matched skill/certification counts
+        experience_years = cast(func.coalesce(Applicant.experience_years, 0), Float)
+        desired_salary = cast(Applicant.desired_salary, Float)
+        columns = [
+            Applicant.id.label('applicant_id'),
+            case((Applicant.education_level.in_(EDUCATION_LEVELS[max(plan.education_rank or 0, 0):]), True), else_=False).label('education_met'),
+            experience_years.label('experience_years'),
+            desired_salary.label('desired_salary'),
+            Applicant.location.label('location'),
+            Applicant.willing_to_relocate.label('willing_to_relocate'),
+        ]
+        joins = []
+        ratios = []
+        for points, count, table, column, catalog_ids in (
+            (30, len(plan.required_skill_names), applicant_skill, 'skill_id', plan.required_skill_ids),
+            (10, len(plan.preferred_skill_names), applicant_skill, 'skill_id', plan.preferred_skill_ids),
+            (10, plan.required_cert_count, applicant_certification, 'certification_id', plan.required_cert_ids),
+        ):
+            if not count:
+                continue
+            name = f'matched_{len(ratios)}'
+            ratios.append((points, count, name))
+            if catalog_ids:
+                matched = self._matched(table, column, catalog_ids)
+                joins.append(matched)
+                columns.append(func.coalesce(matched.c.matched, 0).label(name))
+            else:
+                columns.append(literal(0).label(name))  # No applicant holds any of them
+        inputs = select(*columns)
+        for matched in joins:
+            inputs = inputs.outerjoin(matched, matched.c.applicant_id == Applicant.id)
+        inputs = inputs.where(*clauses).subquery('inputs')
+
+        terms = []
+
+        # Education match (worth 20 points)
+        if plan.education_rank is not None:
+            if plan.education_rank == -1:
+                terms.append(_real(20))
+            else:
+                terms.append(case((inputs.c.education_met, _real(20)), else_=_real(0)))
+
+        # Experience match (worth 20 points)
+        if plan.min_experience is not None:
+            exp_ratio = _least(inputs.c.experience_years / _real(max(plan.min_experience, 1)), _real(2))
+            terms.append(case(
+                (inputs.c.experience_years >= _real(plan.min_experience), _least(_real(20), _real(10) + _real(5) * exp_ratio)),
+                else_=_real(0)
+            ))
+
+        # Required skills, preferred skills and certifications match (worth 30, 10 and 10 points)
+        for points, count, name in ratios:
+            terms.append(_real(points) * (cast(inputs.c[name], Float) / _real(count)))
+
+        # Location match (worth 5 points)
+        if plan.location_preference:
+            preference = literal(plan.location_preference)
+            location = inputs.c.location
+            whens = [(and_(location.isnot(None), self._contains(location, preference) | self._contains(preference, location)), _real(5))]
+            if plan.relocation_required:
+                whens.append((inputs.c.willing_to_relocate.is_(True), _real(3)))
+            terms.append(case(*whens, else_=_real(0)))
+
+        # Salary match (worth 5 points)
+        if plan.has_salary_range:
+            desired_salary = inputs.c.desired_salary
+            min_salary = _real(plan.min_salary)
+            max_salary = _real(plan.max_salary)
+            if plan.max_salary:
+                salary_diff = _least(func.abs(desired_salary - min_salary), func.abs(desired_salary - max_salary))
+                salary_ratio = _greatest(_real(0), _real(1) - (salary_diff / max_salary))
+            else:
+                salary_ratio = _real(0)  # A zero ceiling leaves no partial salary points
+            terms.append(case(
+                (desired_salary.is_(None), _real(0)),
+                (and_(desired_salary >= min_salary, desired_salary <= max_salary), _real(5)),
+                else_=_real(5) * salary_ratio
+            ))
+
+        if plan.max_score == 0:
+            return select(inputs.c.applicant_id, literal(0).label('match_score')).where(False)
+
+        # Sum the components in scoring order, then take the percentage
+        score = _real(0)
+        for term in terms:
+            score = score + term
+        percent = select(
+            inputs.c.applicant_id,
+            ((score / _real(plan.max_score)) * _real(100)).label('percent')
+        ).subquery('percent')
+        whole = select(
+            percent.c.applicant_id,
+            percent.c.percent,
+            self._floor_int(percent.c.percent).label('whole')
+        ).subquery('whole')
+
+        # Round half to even like Python's round
+        fraction = whole.c.percent - whole.c.whole
+        match_score = case(
+            (fraction > _real(0.5), whole.c.whole + 1),
+            (fraction < _real(0.5), whole.c.whole),
+            else_=whole.c.whole + whole.c.whole % 2
+        )
+        scored = select(whole.c.applicant_id, match_score.label('match_score')).subquery('scored')
+        return select(scored.c.applicant_id, scored.c.match_score).where(scored.c.match_score > 30)
+
+    def score(self, plan, clauses=()):
+        """All (applicant_id, match_score) pairs above the cutoff, in applicant order"""
+        applicant_ids, scores = self.score_arrays(plan, clauses)
+        return list(zip(applicant_ids.tolist(), scores.tolist()))
+
+    def score_arrays(self, plan, clauses=()):
+        """Arrays of the applicant ids and match scores above the cutoff, in applicant order
+
+        The rows are streamed in chunks, each packed into an array as it arrives.
+        """
+        scored = self.scores_query(plan, clauses).subquery()
+        chunks = [np.zeros((0, 2), dtype=np.int64)]
+        for rows in scan_rows(self.session, select(scored.c.applicant_id, scored.c.match_score).order_by(scored.c.applicant_id)):
+            chunks.append(int_array(rows, 2))
+        pairs = np.concatenate(chunks)
+        return pairs[:, 0].copy(), pairs[:, 1].copy()
+
+    def top(self, plan, limit=None, offset=0, clauses=()):
+        """One page of (applicant_id, match_score) pairs, best first, and the total number of matches"""
+        scored = self.scores_query(plan, clauses).subquery()
+        query = select(
+            scored.c.applicant_id, scored.c.match_score, func.count().over().label('total')
+        ).order_by(desc(scored.c.match_score), scored.c.applicant_id).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = self.session.execute(query).all()
+        if rows:
+            total = rows[0].total
+        else:
+            total = self.session.execute(select(func.count()).select_from(scored)).scalar()
+        return [(row.applicant_id, row.match_score) for row in rows], total
@@ -0,0 +1,209 @@
+"""
+Background match tasks: long re-scores run on a thread pool and are tracked in the match_tasks table
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from sqlalchemy import func, select, update
+from ..models.models import MatchTask
+from ..database.db import get_db_session, close_db_session
+
+logger = logging.getLogger(__name__)
+
+# Task threads per application worker process
+TASK_WORKERS = int(os.getenv('MATCH_TASK_WORKERS', '2'))
+
+# Seconds without progress after which a running task is taken to be abandoned (its process died) and requeued
+TASK_STALE_AFTER = int(os.getenv('MATCH_TASK_STALE_AFTER', '600'))
+
+# Task statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Task kind -> function(params, progress) doing the work
+_handlers = {}
+
+def task_handler(kind):
+    """Register the function running tasks of the given kind"""
+    def register(function):
+        _handlers[kind] = function
+        return function
+    return register
+
+@task_handler('job_matches')
+def _job_matches(params, progress):
+    """Store a job's matches, recomputing them when asked to or when none are stored yet"""
+    from .matching import MatchingEngine
+    MatchingEngine().store_job_matches(params['job_id'], refresh=params.get('refresh'), progress=progress)
+
+@task_handler('applicant_matches')
+def _applicant_matches(params, progress):
+    """Publish the shared applicant snapshot with a new applicant, then store its matches for every job whose matches are stored"""
+    from .matching import MatchingEngine
+    matching_engine = MatchingEngine()
+    _publish_applicants(matching_engine.session)
+    matching_engine.refresh_applicant_matches(params['applicant_id'])
+
+def _publish_applicants(session):
+    """Bring the shared applicant snapshot (MATCH_SNAPSHOT_PATH) up to date with the committed applicants
+
+    With MATCHING_BACKEND=sql only the batch match paths read the snapshot, so
+    it is discarded rather than rewritten, and rebuilt when one of them next
+    needs it. A new snapshot comes with another applicants version bump, which
+    makes every worker drop the results it cached from the old one.
+    """
+    from .snapshot import SNAPSHOT_PATH
+    from .matching import MATCHING_BACKEND
+    from .index import invalidate_applicant_index, publish_applicant_index
+    from .versions import APPLICANTS, acknowledge_data_version, bump_data_version
+    from .cache import requirements_cache
+    if not SNAPSHOT_PATH:
+        return  # Each worker's private index was updated by the request or catches up on its next one
+    if MATCHING_BACKEND == 'sql':
+        invalidate_applicant_index()
+    elif publish_applicant_index(session):
+        version = bump_data_version(session, APPLICANTS)
+        session.commit()
+        requirements_cache.invalidate()
+        acknowledge_data_version(APPLICANTS, version)
+
+class TaskRunner:
+    """Runs queued tasks of the match_tasks table on a thread pool
+
+    A task is claimed by switching it from queued to running in one UPDATE,
+    so a task submitted to several processes (e.g. after a restart) runs once.
+    """
+
+    def __init__(self, workers):
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+        self._executor = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='match-task')
+
+    def submit(self, task_id):
+        self._executor.submit(self._run, task_id)
+
+    def _run(self, task_id):
+        session = get_db_session()
+        try:
+            claimed = session.execute(
+                update(MatchTask).where(MatchTask.id == task_id, MatchTask.status == QUEUED).values(
+                    status=RUNNING, worker=self.worker, started_at=func.now(), updated_at=func.now()
+                )
+            ).rowcount
+            session.commit()
+            if not claimed:
+                return
+
+            task = session.get(MatchTask, task_id)
+            handler = _handlers[task.kind]
+            params = json.loads(task.params or '{}')
+            # SQLite has a single writer, held by the task's own transaction while it stores
+            # matches, so there progress is only written up to the point storing starts
+            progress_limit = 0.5 if session.get_bind().dialect.name == 'sqlite' else 1.0
+            reported_at = [time.monotonic()]
+
+            def progress(fraction):
+                # Progress doubles as the heartbeat; written at most once a second
+                if fraction > progress_limit or (fraction < progress_limit and time.monotonic() - reported_at[0] < 1):
+                    return
+                reported_at[0] = time.monotonic()
+                self._update(session, task_id, progress=fraction)
+
+            try:
+                handler(params, progress)
+            except Exception as e:
+                logger.exception("Match task %s failed", task_id)
+                session.rollback()
+                self._update(session, task_id, status=FAILED, error=str(e), finished_at=func.now())
+                return
+            self._update(session, task_id, status=DONE, progress=1.0, finished_at=func.now())
+        finally:
+            close_db_session(session)
+
+    def _update(self, session, task_id, **values):
+        session.execute(update(MatchTask).where(MatchTask.id == task_id).values(updated_at=func.now(), **values))
+        session.commit()
+
+    def recover(self):
+        """Requeue abandoned running tasks and submit every queued task"""
+        session = get_db_session()
+        try:
+            stale_before = session.execute(select(func.now())).scalar() - timedelta(seconds=TASK_STALE_AFTER)
+            session.execute(
+                update(MatchTask).where(MatchTask.status == RUNNING, MatchTask.updated_at < stale_before).values(
+                    status=QUEUED, worker=None
+                )
+            )
+            session.commit()
+            queued = session.execute(
+                select(MatchTask.id).where(MatchTask.status == QUEUED).order_by(MatchTask.created_at)
+            ).scalars().all()
+        finally:
+            close_db_session(session)
+        for task_id in queued:
+            self.submit(task_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Process-wide runner, started on first use in each worker process
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
+
+def get_task_runner():
+    """Return this process's TaskRunner, starting it (and recovering waiting tasks) if needed"""
+    global _runner, _runner_pid
+    with _runner_lock:
+        if _runner is None or _runner_pid != os.getpid():
+            # Threads do not survive the fork of a preloaded gunicorn worker
+            _runner = TaskRunner(TASK_WORKERS)
+            _runner_pid = os.getpid()
+            _runner.recover()
+        return _runner
+
+def add_task(session, kind, job_id=None, **params):
+    """Add a queued task of the given kind to session and return it, to be committed with the caller's changes
+
+    Pass its id to run_task after the commit; should that never happen, the
+    task is still picked up when a worker process next starts its runner.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown task kind: {kind}")
+    if job_id is not None:
+        params['job_id'] = job_id
+    task = MatchTask(id=uuid.uuid4().hex, kind=kind, job_id=job_id, params=json.dumps(params), status=QUEUED, progress=0.0)
+    session.add(task)
+    return task
+
+def run_task(task_id):
+    """Run a committed queued task in the background"""
+    get_task_runner().submit(task_id)
+
+def submit_task(session, kind, job_id=None, **params):
+    """Queue a task of the given kind and return it; it runs in the background once committed here"""
+    task = add_task(session, kind, job_id, **params)
+    session.commit()
+    run_task(task.id)
+    return task
+
+def task_status(task):
+    """JSON-serializable status of a task"""
+    return {
+        "taskId": task.id,
+        "kind": task.kind,
+        "jobId": task.job_id,
+        "status": task.status,
+        "progress": task.progress,
+        "error": task.error,
+        "createdAt": task.created_at.isoformat() if task.created_at else None,
+        "startedAt": task.started_at.isoformat() if task.started_at else None,
+        "finishedAt": task.finished_at.isoformat() if task.finished_at else None,
+    }
@@ -0,0 +1,176 @@
+"""
+Data version counters telling each worker process which of its cached matching data is stale
+"""
+import logging
+import os
+import select as select_module
+import threading
+import time
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from ..models.models import DataVersion
+from ..database.db import engine
+from .cache import requirements_cache
+from .index import refresh_applicant_index
+from .job_index import invalidate_job_index
+
+logger = logging.getLogger(__name__)
+
+# Entities whose changes make cached matching data stale
+APPLICANTS = 'applicants'
+JOBS = 'jobs'
+
+# PostgreSQL channel announcing committed version bumps
+NOTIFY_CHANNEL = 'recruiter_data_changed'
+
+# Seconds between version queries while a PostgreSQL listener is connected
+LISTEN_POLL_INTERVAL = float(os.getenv('DATA_VERSION_POLL_INTERVAL', '30'))
+
+def bump_data_version(session, entity):
+    """Increment the version of entity in the session's transaction and return the new version
+
+    Other processes see the bump, and on PostgreSQL are notified of it, once
+    the transaction that changed the data commits.
+    """
+    bump = update(DataVersion).where(DataVersion.entity == entity).values(version=DataVersion.version + 1)
+    if not session.execute(bump).rowcount:
+        try:
+            with session.begin_nested():
+                session.add(DataVersion(entity=entity, version=1))
+        except IntegrityError:
+            session.execute(bump)  # Created concurrently by another process
+
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(select(func.pg_notify(NOTIFY_CHANNEL, entity)))
+    return session.execute(select(DataVersion.version).where(DataVersion.entity == entity)).scalar()
+
+class _Listener(threading.Thread):
+    """Daemon thread LISTENing for version bumps on a dedicated PostgreSQL connection
+
+    Sets pending on every notification, and on every (re)connect since
+    notifications may have been missed while disconnected.
+    """
+
+    def __init__(self, pending):
+        super().__init__(name='data-version-listener', daemon=True)
+        self.pending = pending
+        self.connected = False
+
+    def run(self):
+        while True:
+            try:
+                connection = engine.raw_connection()
+                try:
+                    driver_connection = connection.driver_connection
+                    driver_connection.autocommit = True
+                    with driver_connection.cursor() as cursor:
+                        cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+                    self.connected = True
+                    self.pending.set()
+                    while True:
+                        select_module.select([driver_connection], [], [], 60)
+                        driver_connection.poll()  # Also raises once the connection is lost
+                        if driver_connection.notifies:
+                            driver_connection.notifies.clear()
+                            self.pending.set()
+                finally:
+                    self.connected = False
+                    connection.invalidate()  # Never hand a listening connection back to the pool
+            except Exception:
+                logger.exception("Data version listener disconnected; reconnecting")
+                time.sleep(5)
+
+class DataVersionWatcher:
+    """Tracks the data versions this process has caught up with
+
+    Without a listener the versions are read on every check (one primary key
+    scan of a tiny table); with a connected PostgreSQL listener only after a
+    notification, or every LISTEN_POLL_INTERVAL seconds as a safety net.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = None
+        self._checked_at = 0.0
+        self._pending = threading.Event()
+        self._listener = None
+        self._listener_pid = None
+
+        self.checks = 0
+        self.queries = 0
+        self.changes_seen = {APPLICANTS: 0, JOBS: 0}
+
+    def _listening(self, session):
+        """Whether a PostgreSQL listener is connected, starting one per process on first use"""
+        if session.get_bind().dialect.name != 'postgresql':
+            return False
+        if self._listener_pid != os.getpid():
+            # Threads do not survive the fork of a preloaded gunicorn worker
+            self._listener_pid = os.getpid()
+            self._listener = _Listener(self._pending)
+            self._listener.start()
+        return self._listener.connected
+
+    def changes(self, session):
+        """Entities whose version changed since the previous check"""
+        with self._lock:
+            self.checks += 1
+            listening = self._listening(session)
+            if (self._seen is not None and listening and not self._pending.is_set()
+                    and time.monotonic() - self._checked_at < LISTEN_POLL_INTERVAL):
+                return set()
+
+            self._pending.clear()
+            self._checked_at = time.monotonic()
+            self.queries += 1
+            versions = dict(session.execute(select(DataVersion.entity, DataVersion.version)).all())
+            seen, self._seen = self._seen, versions
+            if seen is None:
+                return set()  # Nothing is cached before the first check
+
+            changed = {entity for entity, version in versions.items() if seen.get(entity) != version}
+            for entity in changed:
+                self.changes_seen[entity] = self.changes_seen.get(entity, 0) + 1
+            return changed
+
+    def acknowledge(self, entity, version):
+        """Record a bump this process made and already applied, unless other bumps came in between"""
+        with self._lock:
+            if self._seen is not None and self._seen.get(entity, 0) == version - 1:
+                self._seen[entity] = version
+
+    def stats(self):
+        with self._lock:
+            return {
+                "versions": dict(self._seen or {}),
+                "listening": bool(self._listener and self._listener.connected and self._listener_pid == os.getpid()),
+                "checks": self.checks,
+                "queries": self.queries,
+                "changesSeen": dict(self.changes_seen),
+            }
+
+# Process-wide watcher
+_watcher = DataVersionWatcher()
+
+def sync_data_versions(session):
+    """Refresh the matching data other processes changed; returns the changed entities
+
+    The applicant index catches up with the new applicants instead of being
+    rebuilt, and is refreshed before the result cache is cleared so no result
+    scored on the old index is cached afterwards.
+    """
+    changed = _watcher.changes(session)
+    if APPLICANTS in changed:
+        refresh_applicant_index(session)
+        requirements_cache.invalidate()
+    if JOBS in changed:
+        invalidate_job_index()
+    return changed
+
+def acknowledge_data_version(entity, version):
+    """Mark a version bumped (and applied) by this process as seen"""
+    _watcher.acknowledge(entity, version)
+
+def data_version_stats():
+    """Counters of the version checks made by this process"""
+    return _watcher.stats()
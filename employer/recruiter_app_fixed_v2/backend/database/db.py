@@ -3,7 +3,7 @@ Database configuration module for the Recruiter Application
 Supports both SQLite (development) and PostgreSQL (production)
 """
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 from dotenv import load_dotenv
@@ -56,10 +56,39 @@ Base.query = db_session.query_property()
 def init_db():
     """Initialize the database by creating all tables"""
     # Import all models to ensure they are registered with Base
-    from ..models.models import Applicant, Skill, Certification, JobPosition, JobRequirement, User
+    from ..models.models import Applicant, Skill, Certification, JobPosition, JobRequirement, User, ApplicantMatch, JobMatchStatus, MatchTask, DataVersion
     
     # Create tables
     Base.metadata.create_all(bind=engine)
+    
+    # Bring tables created by earlier versions up to date
+    upgrade_applicant_matches()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def upgrade_applicant_matches():
+    """Add the unique (applicant_id, job_id) index the match upsert needs to an older applicant_matches table
+    
+    create_all never alters an existing table, so databases created before the
+    constraint existed lack it. Duplicate rows are removed first, keeping the
+    most recent one of each applicant and job.
+    """
+    inspector = inspect(engine)
+    columns = {'applicant_id', 'job_id'}
+    if any(set(constraint['column_names']) == columns for constraint in inspector.get_unique_constraints('applicant_matches')):
+        return
+    if any(index['unique'] and set(index['column_names']) == columns for index in inspector.get_indexes('applicant_matches')):
+        return
+    
+    with engine.begin() as connection:
+        connection.execute(text(
+            "DELETE FROM applicant_matches WHERE id NOT IN "
+            "(SELECT MAX(id) FROM applicant_matches GROUP BY applicant_id, job_id)"
+        ))
+        connection.execute(text(
+            "CREATE UNIQUE INDEX uq_applicant_matches_applicant_job ON applicant_matches (applicant_id, job_id)"
+        ))
 
 def get_db_session():
     """Get a new database session"""
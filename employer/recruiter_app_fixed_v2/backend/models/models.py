@@ -1,8 +1,9 @@
 """
 Updated models module with User model for authentication
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Table, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Table, Text, DateTime, UniqueConstraint, Index, func
+from sqlalchemy.orm import relationship, joinedload, selectinload
+from sqlalchemy.sql import text
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from ..database.db import Base
@@ -12,14 +13,18 @@ applicant_skill = Table(
     'applicant_skill',
     Base.metadata,
     Column('applicant_id', Integer, ForeignKey('applicants.id')),
-    Column('skill_id', Integer, ForeignKey('skills.id'))
+    Column('skill_id', Integer, ForeignKey('skills.id')),
+    # Serves must-have skill filters (EXISTS by skill for each applicant)
+    Index('idx_applicant_skill_skill', 'skill_id', 'applicant_id')
 )
 
 applicant_certification = Table(
     'applicant_certification',
     Base.metadata,
     Column('applicant_id', Integer, ForeignKey('applicants.id')),
-    Column('certification_id', Integer, ForeignKey('certifications.id'))
+    Column('certification_id', Integer, ForeignKey('certifications.id')),
+    # Serves must-have certification filters
+    Index('idx_applicant_certification_cert', 'certification_id', 'applicant_id')
 )
 
 job_skill = Table(
@@ -92,6 +97,12 @@ class Certification(Base):
 class Applicant(Base):
     """Applicant model"""
     __tablename__ = 'applicants'
+    __table_args__ = (
+        # Serve must-have requirement filters
+        Index('idx_applicants_education', 'education_level'),
+        Index('idx_applicants_experience', 'experience_years'),
+        Index('idx_applicants_salary', 'desired_salary'),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
@@ -149,3 +160,76 @@ class JobPosition(Base):
     
     def __repr__(self):
         return f'<JobPosition {self.title}>'
+
+
+# Eager loading for read paths that touch a job's skills, certifications or requirements,
+# so a list of N jobs costs a fixed number of queries instead of one lazy load per row
+JOB_EAGER_LOAD = (
+    joinedload(JobPosition.requirements),
+    selectinload(JobPosition.required_skills),
+    selectinload(JobPosition.required_certifications),
+)
+
+class ApplicantMatch(Base):
+    """Stored match score of an applicant for a job position"""
+    __tablename__ = 'applicant_matches'
+    __table_args__ = (
+        UniqueConstraint('applicant_id', 'job_id', name='uq_applicant_matches_applicant_job'),
+        # Serves GET /api/job/<id>/matches as a range scan in result order
+        Index('ix_applicant_matches_job_score', 'job_id', text('match_score DESC'), 'applicant_id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey('job_positions.id', ondelete='CASCADE'), nullable=False)
+    applicant_id = Column(Integer, ForeignKey('applicants.id', ondelete='CASCADE'), nullable=False)
+    match_score = Column(Integer, nullable=False)
+    match_date = Column(DateTime, default=func.now(), onupdate=func.now())
+    notes = Column(Text)
+    
+    def __repr__(self):
+        return f'<ApplicantMatch applicant_id {self.applicant_id} job_id {self.job_id}>'
+
+class JobMatchStatus(Base):
+    """Marks a job position whose applicant_matches rows are complete and kept current"""
+    __tablename__ = 'job_match_status'
+    
+    job_id = Column(Integer, ForeignKey('job_positions.id', ondelete='CASCADE'), primary_key=True)
+    scored_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f'<JobMatchStatus job_id {self.job_id}>'
+
+class MatchTask(Base):
+    """Background matching task (e.g. a job's full re-score), with its status and progress"""
+    __tablename__ = 'match_tasks'
+    __table_args__ = (
+        # Serves the queue scan for tasks waiting to run
+        Index('ix_match_tasks_status', 'status', 'created_at'),
+    )
+    
+    id = Column(String(32), primary_key=True)  # Random hex id handed to the client
+    kind = Column(String(50), nullable=False)  # e.g. 'job_matches'
+    job_id = Column(Integer, ForeignKey('job_positions.id', ondelete='CASCADE'))
+    params = Column(Text)  # JSON parameters of the task
+    status = Column(String(20), nullable=False, default='queued')  # 'queued', 'running', 'done' or 'failed'
+    progress = Column(Float, nullable=False, default=0.0)  # Fraction of the work done, 0 to 1
+    error = Column(Text)
+    worker = Column(String(100))  # host:pid of the process running the task
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f'<MatchTask {self.id} {self.kind} {self.status}>'
+
+class DataVersion(Base):
+    """Counter bumped whenever data of an entity ('applicants', 'jobs') changes, for cross-worker cache invalidation"""
+    __tablename__ = 'data_versions'
+    
+    entity = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f'<DataVersion {self.entity} {self.version}>'
@@ -1,12 +1,205 @@
 """
 API routes for the Recruiter Application
 """
-from flask import Blueprint, request, jsonify, redirect, url_for
+from flask import Blueprint, Response, current_app, g, request, jsonify, redirect, url_for, stream_with_context
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create blueprint
 api = Blueprint('api', __name__)
 
+# Largest number of job positions accepted by the batch matching endpoint
+MAX_BATCH_JOBS = 100
+
+# Admission cost of a request reading a page of computed matches, and of one running a scoring pass over the applicant pool
+PAGE_COST = 1
+SCORING_COST = 2
+
+# Endpoints running a scoring pass on every request
+SCORING_ENDPOINTS = ('api.process_requirements', 'api.match_applicants', 'api.get_jobs_matches')
+
+# Endpoints reading a page of computed matches
+PAGE_ENDPOINTS = ('api.get_task_result', 'api.get_applicant_matches')
+
+@api.before_request
+def refresh_stale_data():
+    """Pick up applicant and job changes committed by other worker processes"""
+    # Import here to avoid circular imports
+    from backend.database.db import get_db_session, close_db_session
+    from backend.app.versions import sync_data_versions
+    
+    session = get_db_session()
+    try:
+        sync_data_versions(session)
+    finally:
+        close_db_session(session)
+
+def _match_cost():
+    """Admission cost of the current request, 0 for requests that compute no matches"""
+    if request.endpoint in SCORING_ENDPOINTS:
+        cost = SCORING_COST
+    elif request.endpoint in PAGE_ENDPOINTS:
+        cost = PAGE_COST
+    elif request.endpoint == 'api.get_job_matches':
+        if request.args.get('async') == '1':
+            return 0  # Only queues a task
+        # Raised to a scoring pass by _admit_scoring should the matches turn out not to be stored
+        cost = SCORING_COST if request.args.get('refresh') == '1' else PAGE_COST
+    else:
+        return 0
+    # Analyzing every match of an unpaged list costs about as much again
+    if request.endpoint != 'api.get_jobs_matches' and 'limit' not in request.args and _include_analysis():
+        cost += PAGE_COST
+    return cost
+
+@api.before_request
+def admit_match_request():
+    """Hold back match computations beyond this worker's capacity, so light requests keep their threads
+    
+    A request that cannot be admitted within MATCH_ADMISSION_WAIT seconds, or
+    finds MATCH_ADMISSION_QUEUE requests already waiting, gets 503 with a
+    Retry-After header.
+    """
+    cost = _match_cost()
+    if not cost:
+        return None
+    
+    # Import here to avoid circular imports
+    from backend.app.admission import match_admission, Overloaded
+    
+    try:
+        g.admission_cost = match_admission.acquire(cost)
+    except Overloaded as e:
+        return _overloaded_response(e)
+    return None
+
+def _admit_scoring():
+    """Raise the admission of a request admitted to read stored matches to a scoring pass
+    
+    Its units are returned before the larger amount is waited for, so no
+    request waits for capacity while holding some. Raises Overloaded.
+    """
+    # Import here to avoid circular imports
+    from backend.app.admission import match_admission
+    
+    cost = g.pop('admission_cost', None)
+    if cost:
+        match_admission.release(cost)
+    g.admission_cost = match_admission.acquire((cost or PAGE_COST) + SCORING_COST - PAGE_COST)
+
+def _overloaded_response(e):
+    """503 response telling the client when to retry a match request that was not admitted"""
+    response = jsonify({"error": str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@api.teardown_request
+def release_match_request(exception=None):
+    """Return the admission units of a match request once its response is finished (streamed ones included)"""
+    cost = g.pop('admission_cost', None)
+    if cost:
+        # Import here to avoid circular imports
+        from backend.app.admission import match_admission
+        
+        match_admission.release(cost)
+
+def _get_pagination():
+    """Read the limit/offset query parameters of a match request
+    
+    Raises ValueError unless both are absent or non-negative integers.
+    """
+    limit = request.args.get('limit')
+    offset = request.args.get('offset', '0')
+    try:
+        limit = None if limit is None else int(limit)
+        offset = int(offset)
+    except ValueError:
+        limit = offset = -1
+    if (limit is not None and limit < 0) or offset < 0:
+        raise ValueError("limit and offset must be non-negative integers")
+    return limit, offset
+
+def _get_deadline():
+    """Read the deadline_ms query parameter of a match request: a time budget for scoring, or None"""
+    deadline_ms = request.args.get('deadline_ms')
+    if deadline_ms is None:
+        return None
+    try:
+        deadline_ms = int(deadline_ms)
+    except ValueError:
+        deadline_ms = 0
+    if deadline_ms <= 0:
+        raise ValueError("deadline_ms must be a positive integer")
+    return deadline_ms
+
+def _include_analysis():
+    """Whether match analysis should be embedded in a match list (?analysis=0 to skip)"""
+    return request.args.get('analysis', '1').lower() not in ('0', 'false', 'no')
+
+def _wants_ndjson():
+    """Whether the client asked for newline-delimited JSON (Accept: application/x-ndjson)"""
+    return request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+def _match_response(matches, total, serialize, scanned=1.0):
+    """Respond with serialized matches as a JSON list, or streamed as NDJSON in score order
+    
+    The total number of matches, and whether they come from the whole applicant pool
+    or only the fraction scanned before a deadline, travel in headers so the body
+    stays a plain list.
+    """
+    if _wants_ndjson():
+        def generate():
+            for match in matches:
+                yield current_app.json.dumps(serialize(match)) + '\n'
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    else:
+        response = jsonify([serialize(match) for match in matches])
+    response.headers['X-Total-Count'] = str(total)
+    response.headers['X-Match-Complete'] = 'true' if scanned >= 1.0 else 'false'
+    response.headers['X-Match-Scanned'] = f'{scanned:.4f}'
+    response.vary.add('Accept')
+    return response
+
+def _serialize_job_match(match):
+    """Convert a job match to JSON-serializable format"""
+    applicant = match["applicant"]
+    
+    # Format skills with matched flag
+    skills = []
+    for skill in applicant.skills:
+        skill_obj = {
+            "name": skill.name,
+            "matched": hasattr(skill, 'matched') and skill.matched
+        }
+        skills.append(skill_obj)
+    
+    # Format certifications
+    certifications = [{"name": cert.name} for cert in applicant.certifications]
+    
+    # Create applicant object
+    return {
+        "id": applicant.id,
+        "name": applicant.name,
+        "email": applicant.email,
+        "phone": applicant.phone,
+        "educationLevel": applicant.education_level,
+        "institution": applicant.institution,
+        "major": applicant.major,
+        "experienceYears": applicant.experience_years,
+        "currentPosition": applicant.current_position,
+        "currentCompany": applicant.current_company,
+        "location": applicant.location,
+        "willingToRelocate": applicant.willing_to_relocate,
+        "desiredSalary": applicant.desired_salary,
+        "skills": skills,
+        "certifications": certifications,
+        "matchScore": match["match_score"],
+        "matchAnalysis": match["match_analysis"]
+    }
+
 @api.route('/requirements', methods=['POST'])
 def process_requirements():
     """Process job requirements and find matching applicants"""
@@ -18,16 +211,27 @@ def process_requirements():
         if not requirements:
             return jsonify({"error": "No requirements provided"}), 400
         
+        try:
+            limit, offset = _get_pagination()
+            deadline_ms = _get_deadline()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         # Import here to avoid circular imports
         from backend.app.matching import MatchingEngine
         
-        # Use matching engine to find matching applicants
+        # Use matching engine to find one page of matching applicants
         matching_engine = MatchingEngine()
-        matches = matching_engine.find_matching_applicants_from_requirements(requirements)
+        try:
+            matches, total, scanned = matching_engine.find_matching_applicants_from_requirements(
+                requirements, limit, offset, include_analysis=_include_analysis(), stream=_wants_ndjson(),
+                search_session=requirements.get('searchSession'), deadline_ms=deadline_ms
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Convert matches to JSON-serializable format
-        results = []
-        for match in matches:
+        # Convert a match to JSON-serializable format
+        def serialize(match):
             applicant = match["applicant"]
             
             # Format skills with matched flag
@@ -44,7 +248,7 @@ def process_requirements():
             certifications = [{"name": cert.name} for cert in applicant.certifications]
             
             # Create applicant object
-            applicant_obj = {
+            return {
                 "id": applicant.id,
                 "name": applicant.name,
                 "email": applicant.email,
@@ -63,10 +267,8 @@ def process_requirements():
                 "matchScore": match["match_score"],
                 "matchAnalysis": match["match_analysis"]
             }
-            
-            results.append(applicant_obj)
         
-        return jsonify(results)
+        return _match_response(matches, total, serialize, scanned)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -145,10 +347,13 @@ def create_job():
                     # Add certification to job
                     job.required_certifications.append(cert)
             
-            # Commit changes
+            # Commit changes, telling the other workers that jobs changed. The task storing
+            # the job's matches, so reading them is an indexed lookup, is committed with it
+            from backend.app.versions import JOBS, bump_data_version
+            from backend.app.tasks import add_task
+            version = bump_data_version(session, JOBS)
+            job_id, task_id = job.id, add_task(session, 'job_matches', job_id=job.id).id
             session.commit()
-            
-            return jsonify({"id": job.id, "message": "Job created successfully"})
         
         except Exception as e:
             session.rollback()
@@ -156,84 +361,251 @@ def create_job():
         
         finally:
             close_db_session(session)
+        
+        _job_committed(version, task_id)
+        return jsonify({"id": job_id, "message": "Job created successfully"})
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _job_committed(version, task_id):
+    """Update this worker's job index after a job was committed and start the task storing its matches
+    
+    The job exists whatever happens here, so failures are logged rather than
+    returned: the data version is then left unacknowledged, making the next
+    request rebuild the job index, and a task that was not started is
+    recovered when a worker process starts its task runner.
+    """
+    # Import here to avoid circular imports
+    from backend.app.versions import JOBS, acknowledge_data_version
+    from backend.app.job_index import invalidate_job_index
+    from backend.app.tasks import run_task
+    
+    try:
+        invalidate_job_index()
+        acknowledge_data_version(JOBS, version)
+    except Exception:
+        logger.exception("Updating the job index after a job was created failed")
+    try:
+        run_task(task_id)
+    except Exception:
+        logger.exception("Starting match task %s failed", task_id)
+
 @api.route('/job/<int:job_id>/matches', methods=['GET'])
 def get_job_matches(job_id):
     """Get applicants matching a job position"""
+    try:
+        limit, offset = _get_pagination()
+        deadline_ms = _get_deadline()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     try:
         # Import here to avoid circular imports
         from backend.app.matching import MatchingEngine
+        from backend.app.admission import Overloaded
         
-        # Use matching engine to find matching applicants
+        if request.args.get('async') == '1':
+            return _submit_job_matches_task(job_id)
+        
+        # Use matching engine to find one page of matching applicants; a refresh
+        # was admitted as a scoring pass already
+        refresh = request.args.get('refresh') == '1'
         matching_engine = MatchingEngine()
-        matches = matching_engine.find_matching_applicants(job_id)
+        try:
+            matches, total, scanned = matching_engine.find_matching_applicants(
+                job_id, limit, offset, include_analysis=_include_analysis(), refresh=refresh,
+                stream=_wants_ndjson(), deadline_ms=deadline_ms, before_scoring=None if refresh else _admit_scoring
+            )
+        except Overloaded as e:
+            return _overloaded_response(e)
         
-        # Convert matches to JSON-serializable format
-        results = []
-        for match in matches:
-            applicant = match["applicant"]
-            
-            # Format skills with matched flag
-            skills = []
-            for skill in applicant.skills:
-                skill_obj = {
-                    "name": skill.name,
-                    "matched": hasattr(skill, 'matched') and skill.matched
-                }
-                skills.append(skill_obj)
-            
-            # Format certifications
-            certifications = [{"name": cert.name} for cert in applicant.certifications]
-            
-            # Create applicant object
-            applicant_obj = {
-                "id": applicant.id,
-                "name": applicant.name,
-                "email": applicant.email,
-                "phone": applicant.phone,
-                "educationLevel": applicant.education_level,
-                "institution": applicant.institution,
-                "major": applicant.major,
-                "experienceYears": applicant.experience_years,
-                "currentPosition": applicant.current_position,
-                "currentCompany": applicant.current_company,
-                "location": applicant.location,
-                "willingToRelocate": applicant.willing_to_relocate,
-                "desiredSalary": applicant.desired_salary,
-                "skills": skills,
-                "certifications": certifications,
-                "matchScore": match["match_score"],
-                "matchAnalysis": match["match_analysis"]
-            }
-            
-            results.append(applicant_obj)
+        return _match_response(matches, total, _serialize_job_match, scanned)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _submit_job_matches_task(job_id):
+    """Queue the computation of a job's matches and respond with the task to poll"""
+    # Import here to avoid circular imports
+    from backend.database.db import get_db_session, close_db_session
+    from backend.models.models import JobPosition
+    from backend.app.tasks import submit_task, task_status
+    
+    session = get_db_session()
+    try:
+        if not session.get(JobPosition, job_id):
+            return jsonify({"error": "Job not found"}), 404
+        
+        task = submit_task(session, 'job_matches', job_id=job_id, refresh=request.args.get('refresh') == '1')
+        response = jsonify(task_status(task))
+        response.status_code = 202
+        response.headers['Location'] = url_for('api.get_task', task_id=task.id)
+        return response
+    finally:
+        close_db_session(session)
+
+@api.route('/tasks/<task_id>', methods=['GET'])
+def get_task(task_id):
+    """Get the status and progress of a background task"""
+    try:
+        # Import here to avoid circular imports
+        from backend.database.db import get_db_session, close_db_session
+        from backend.models.models import MatchTask
+        from backend.app.tasks import get_task_runner, task_status
         
-        return jsonify(results)
+        # Starting this worker's task runner also picks up tasks left waiting by a restart
+        get_task_runner()
+        
+        session = get_db_session()
+        try:
+            task = session.get(MatchTask, task_id)
+            if not task:
+                return jsonify({"error": "Task not found"}), 404
+            return jsonify(task_status(task))
+        finally:
+            close_db_session(session)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@api.route('/tasks/<task_id>/result', methods=['GET'])
+def get_task_result(task_id):
+    """Get one page of the matches computed by a finished job matches task"""
+    try:
+        limit, offset = _get_pagination()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        # Import here to avoid circular imports
+        from backend.database.db import get_db_session, close_db_session
+        from backend.models.models import MatchTask
+        from backend.app.matching import MatchingEngine
+        from backend.app.tasks import DONE, FAILED
+        
+        session = get_db_session()
+        try:
+            task = session.get(MatchTask, task_id)
+            if not task:
+                return jsonify({"error": "Task not found"}), 404
+            if task.status == FAILED:
+                return jsonify({"error": f"Task failed: {task.error}"}), 409
+            if task.status != DONE:
+                return jsonify({"error": f"Task is {task.status}", "progress": task.progress}), 409
+            job_id = task.job_id
+        finally:
+            close_db_session(session)
+        
+        # The task stored the job's matches, so its result is read like GET /api/job/<id>/matches
+        matching_engine = MatchingEngine()
+        matches, total, _ = matching_engine.find_matching_applicants(
+            job_id, limit, offset, include_analysis=_include_analysis(), stream=_wants_ndjson()
+        )
+        
+        return _match_response(matches, total, _serialize_job_match)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/job/<int:job_id>/matches/<int:applicant_id>/analysis', methods=['GET'])
+def get_job_match_analysis(job_id, applicant_id):
+    """Get the match analysis of one applicant for a job position"""
+    try:
+        # Import here to avoid circular imports
+        from backend.app.matching import MatchingEngine
+        
+        matching_engine = MatchingEngine()
+        match = matching_engine.analyze_job_match(job_id, applicant_id)
+        
+        if match is None:
+            return jsonify({"error": "Job or applicant not found"}), 404
+        
+        return jsonify({
+            "jobId": job_id,
+            "applicantId": applicant_id,
+            "matchScore": match["match_score"],
+            "matchAnalysis": match["match_analysis"]
+        })
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/jobs/matches', methods=['POST'])
+def get_jobs_matches():
+    """Get the best matching applicants for several job positions in one request"""
+    data = request.json or {}
+    job_ids = data.get('jobIds')
+    limit = data.get('limit', 10)
+    
+    # Validate the batch
+    if not isinstance(job_ids, list) or not job_ids or not all(isinstance(job_id, int) and not isinstance(job_id, bool) for job_id in job_ids):
+        return jsonify({"error": "jobIds must be a non-empty list of job ids"}), 400
+    if len(job_ids) > MAX_BATCH_JOBS:
+        return jsonify({"error": f"At most {MAX_BATCH_JOBS} jobs can be matched per request"}), 400
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 0):
+        return jsonify({"error": "limit must be a non-negative integer"}), 400
+    
+    try:
+        # Import here to avoid circular imports
+        from backend.app.matching import MatchingEngine
+        
+        # Score every job against the same applicant snapshot
+        matching_engine = MatchingEngine()
+        results = matching_engine.find_matching_applicants_for_jobs(
+            job_ids, limit, include_analysis=_include_analysis()
+        )
+        
+        return jsonify([
+            {
+                "jobId": job.id,
+                "title": job.title,
+                "total": total,
+                "matches": [_serialize_job_match(match) for match in matches]
+            }
+            for job, matches, total in results
+        ])
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get counters of the in-process matching caches, request coalescing and admission control"""
+    # Import here to avoid circular imports
+    from backend.app.cache import requirements_cache, search_sessions, requirement_flights, job_match_flights
+    from backend.app.admission import match_admission
+    from backend.app.versions import data_version_stats
+    
+    return jsonify({
+        "requirementsCache": requirements_cache.stats(),
+        "searchSessions": search_sessions.stats(),
+        "coalescing": {
+            "requirements": requirement_flights.stats(),
+            "jobMatches": job_match_flights.stats()
+        },
+        "admission": match_admission.stats(),
+        "dataVersions": data_version_stats()
+    })
+
 @api.route('/applicants', methods=['GET'])
 def get_applicants():
     """Get all applicants"""
     try:
         # Import here to avoid circular imports
         from backend.database.db import get_db_session, close_db_session
-        from backend.models.models import Applicant
+        from backend.app.records import load_applicant_records
         
         # Get database session
         session = get_db_session()
         
         try:
-            # Get all applicants
-            applicants = session.query(Applicant).all()
+            # Get all applicants as read-only records, with skills and certifications loaded in bulk
+            applicants = load_applicant_records(session)
             
             # Convert applicants to JSON-serializable format
             results = []
-            for applicant in applicants:
+            for applicant in applicants.values():
                 # Format skills
                 skills = [{"name": skill.name} for skill in applicant.skills]
                 
@@ -275,14 +647,14 @@ def get_applicant(applicant_id):
     try:
         # Import here to avoid circular imports
         from backend.database.db import get_db_session, close_db_session
-        from backend.models.models import Applicant
+        from backend.app.records import load_applicant_record
         
         # Get database session
         session = get_db_session()
         
         try:
             # Get applicant
-            applicant = session.query(Applicant).filter(Applicant.id == applicant_id).first()
+            applicant = load_applicant_record(session, applicant_id)
             
             if not applicant:
                 return jsonify({"error": "Applicant not found"}), 404
@@ -320,6 +692,44 @@ def get_applicant(applicant_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@api.route('/applicants/<int:applicant_id>/matches', methods=['GET'])
+def get_applicant_matches(applicant_id):
+    """Get the job positions an applicant matches, best first"""
+    try:
+        limit, offset = _get_pagination()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        # Import here to avoid circular imports
+        from backend.app.matching import MatchingEngine
+        
+        matching_engine = MatchingEngine()
+        found = matching_engine.find_matching_jobs(
+            applicant_id, limit, offset, include_analysis=_include_analysis()
+        )
+        
+        if found is None:
+            return jsonify({"error": "Applicant not found"}), 404
+        
+        # Convert a match to JSON-serializable format
+        def serialize(match):
+            job = match["job"]
+            return {
+                "id": job.id,
+                "title": job.title,
+                "department": job.department,
+                "requiredSkills": [skill.name for skill in job.required_skills],
+                "matchScore": match["match_score"],
+                "matchAnalysis": match["match_analysis"]
+            }
+        
+        matches, total = found
+        return _match_response(matches, total, serialize)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @api.route('/applicants', methods=['POST'])
 def create_applicant():
     """Create a new applicant"""
@@ -385,17 +795,51 @@ def create_applicant():
                     # Add certification to applicant
                     applicant.certifications.append(cert)
             
-            # Commit changes
+            # Commit changes, telling the other workers that applicants changed. The task
+            # storing the applicant's job matches is committed with it, so it is not lost
+            # should this process die before running it
+            from backend.app.versions import APPLICANTS, bump_data_version
+            from backend.app.tasks import add_task
+            version = bump_data_version(session, APPLICANTS)
+            applicant_id, task_id = applicant.id, add_task(session, 'applicant_matches', applicant_id=applicant.id).id
             session.commit()
-            
-            return jsonify({"id": applicant.id, "message": "Applicant created successfully"})
         
         except Exception as e:
             session.rollback()
+            close_db_session(session)
             raise e
         
+        try:
+            _applicant_committed(applicant, version, task_id)
         finally:
             close_db_session(session)
+        return jsonify({"id": applicant_id, "message": "Applicant created successfully"})
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+def _applicant_committed(applicant, version, task_id):
+    """Add a committed applicant to this worker's index and start the task storing its job matches
+    
+    The applicant exists whatever happens here, so failures are logged rather
+    than returned: the data version is then left unacknowledged, making the
+    next request catch the index up, and a task that was not started is
+    recovered when a worker process starts its task runner.
+    """
+    # Import here to avoid circular imports
+    from backend.app.versions import APPLICANTS, acknowledge_data_version
+    from backend.app.index import index_applicant
+    from backend.app.cache import requirements_cache
+    from backend.app.tasks import run_task
+    
+    try:
+        # Keep the matching index and its skill posting lists current
+        index_applicant(applicant)
+        requirements_cache.invalidate()
+        acknowledge_data_version(APPLICANTS, version)
+    except Exception:
+        logger.exception("Updating the applicant index after an applicant was created failed")
+    try:
+        run_task(task_id)
+    except Exception:
+        logger.exception("Starting match task %s failed", task_id)
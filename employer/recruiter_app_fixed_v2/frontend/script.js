@@ -431,6 +431,9 @@ document.addEventListener('DOMContentLoaded', function() {
         findMatchingApplicants(formData);
     });
     
+    // Identifies this page visit's searches to the server
+    const searchSession = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    
     // Function to find matching applicants via API
     function findMatchingApplicants(requirements) {
         // Show loading state
@@ -448,13 +451,13 @@ document.addEventListener('DOMContentLoaded', function() {
         // Scroll to results
         resultsSection.scrollIntoView({ behavior: 'smooth' });
         
-        // Call API
+        // Call API; searches of one page visit share a session so the server only rescores changed criteria
         fetch(`${API_URL}/match_applicants`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify(requirements)
+            body: JSON.stringify(Object.assign({}, requirements, { searchSession: searchSession }))
         })
         .then(response => {
             if (!response.ok) {
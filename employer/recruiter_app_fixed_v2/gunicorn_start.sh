@@ -7,14 +7,21 @@
 export FLASK_APP=app.py
 export FLASK_ENV=production
 
-# Create log directory if it doesn't exist
+# Workers share one memory-mapped applicant snapshot instead of building an index each
+export MATCH_SNAPSHOT_PATH=${MATCH_SNAPSHOT_PATH:-snapshots/applicants.snapshot}
+
+# Create log and snapshot directories if they don't exist
 mkdir -p logs
+mkdir -p "$(dirname "$MATCH_SNAPSHOT_PATH")"
 
-# Start Gunicorn with 4 worker processes
+# Start Gunicorn with 4 worker processes of 8 threads each; identical match
+# requests handled by threads of one worker share a single computation, and
+# admission control keeps match requests from taking every thread
 # Bind to all interfaces on port 5000
 # Log to specified files
 exec gunicorn \
     --workers 4 \
+    --threads ${GUNICORN_THREADS:-8} \
     --bind 0.0.0.0:5000 \
     --access-logfile logs/access.log \
     --error-logfile logs/error.log \
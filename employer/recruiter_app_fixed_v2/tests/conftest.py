@@ -0,0 +1,97 @@
+"""
+Shared fixtures: the application running on a throwaway SQLite database
+"""
+import os
+import random
+import sys
+import tempfile
+
+# The database module reads its settings on import, so they are set before anything imports it
+os.environ['DB_TYPE'] = 'sqlite'
+os.environ['DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='recruiter-tests-'), 'recruiter.db')
+os.environ['MATCH_SNAPSHOT_PATH'] = ''
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+SKILLS = ['Python', 'Java', 'SQL', 'AWS', 'React', 'Docker']
+CERTIFICATIONS = ['AWS Certified', 'PMP', 'Scrum Master']
+EDUCATION_LEVELS = ['High School', "Associate's", "Bachelor's", "Master's", 'PhD']
+LOCATIONS = ['San Francisco, CA', 'New York, NY', 'Austin, TX', 'Remote', None]
+
+@pytest.fixture
+def engine():
+    """The application's engine on empty tables, with every in-process index and cache dropped"""
+    from backend.database.db import Base, engine, init_db
+    from backend.app.index import invalidate_applicant_index
+    from backend.app.job_index import invalidate_job_index
+    from backend.app.cache import requirements_cache, search_sessions
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    invalidate_applicant_index()
+    invalidate_job_index()
+    requirements_cache.invalidate()
+    search_sessions.invalidate()
+    return engine
+
+@pytest.fixture
+def session(engine):
+    from backend.database.db import get_db_session, close_db_session
+    session = get_db_session()
+    yield session
+    close_db_session(session)
+
+@pytest.fixture
+def client(engine):
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
+
+@pytest.fixture
+def seed(session):
+    """Function adding n random applicants (some with missing fields) and jobs jobs, returning their ids"""
+    from backend.models.models import Applicant, Skill, Certification, JobPosition, JobRequirement
+
+    def seed(n, jobs=3, seed=1):
+        rnd = random.Random(seed)
+        skills = {skill.name: skill for skill in session.query(Skill)}
+        for name in SKILLS:
+            skills.setdefault(name, Skill(name=name))
+        certifications = {certification.name: certification for certification in session.query(Certification)}
+        for name in CERTIFICATIONS:
+            certifications.setdefault(name, Certification(name=name))
+        applicants = []
+        for i in range(n):
+            applicant = Applicant(
+                name=f'Applicant {i}', email=f'applicant{i}.{seed}@example.com',
+                education_level=rnd.choice(EDUCATION_LEVELS), experience_years=rnd.choice([None] + list(range(12))),
+                location=rnd.choice(LOCATIONS), willing_to_relocate=rnd.random() < 0.5,
+                desired_salary=rnd.choice([None, 60000, 90000, 120000, 150000])
+            )
+            applicant.skills = rnd.sample(list(skills.values()), rnd.randint(0, 4))
+            applicant.certifications = rnd.sample(list(certifications.values()), rnd.randint(0, 2))
+            applicants.append(applicant)
+        positions = []
+        for i in range(jobs):
+            job = JobPosition(title=f'Job {i}')
+            job.requirements = JobRequirement(
+                min_education_level=rnd.choice(EDUCATION_LEVELS), min_experience_years=rnd.randint(0, 6),
+                location_preference=rnd.choice(LOCATIONS), relocation_required=rnd.random() < 0.5,
+                min_salary=70000, max_salary=140000
+            )
+            job.required_skills = rnd.sample(list(skills.values()), rnd.randint(1, 3))
+            job.required_certifications = rnd.sample(list(certifications.values()), rnd.randint(0, 1))
+            positions.append(job)
+        session.add_all(applicants + positions)
+        session.commit()
+        return [applicant.id for applicant in applicants], [job.id for job in positions]
+
+    return seed
+
+@pytest.fixture(params=['index', 'sql'])
+def matching_backend(request, monkeypatch):
+    """Runs the test on each MATCHING_BACKEND"""
+    from backend.app import matching
+    monkeypatch.setattr(matching, 'MATCHING_BACKEND', request.param)
+    return request.param
@@ -0,0 +1,99 @@
+"""
+Match requests beyond the admission budget get 503 with Retry-After, and every admitted request gives its units back
+"""
+import pytest
+
+@pytest.fixture
+def admission(monkeypatch):
+    """A small admission budget (2 units, no queue) recording the cost of every acquire"""
+    from backend.app import admission
+
+    controller = admission.AdmissionController(2, 0, 0.05)
+    controller.costs = []
+    acquire = controller.acquire
+
+    def recording_acquire(cost):
+        controller.costs.append(cost)
+        return acquire(cost)
+
+    controller.acquire = recording_acquire
+    monkeypatch.setattr(admission, 'match_admission', controller)
+    return controller
+
+def test_controller_queues_in_arrival_order_and_times_out():
+    import threading
+    from backend.app.admission import AdmissionController, Overloaded
+
+    controller = AdmissionController(2, 1, 0.2)
+    assert controller.acquire(5) == 2  # Costlier than the capacity: admitted alone
+    with pytest.raises(Overloaded) as overloaded:
+        controller.acquire(1)
+    assert overloaded.value.retry_after == 1
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire(1)))
+    waiter.start()
+    while controller.stats()['waiting'] == 0:
+        pass
+    with pytest.raises(Overloaded):
+        controller.acquire(1)  # The queue is full
+    controller.release(2)
+    waiter.join()
+    assert admitted == [1]
+    assert controller.stats() | {"averageWaitSeconds": 0} == {
+        "capacity": 2, "inUse": 1, "waiting": 0, "admitted": 2, "queued": 2, "rejected": 2, "averageWaitSeconds": 0
+    }
+
+def test_full_budget_rejects_with_retry_after(client, seed, admission):
+    seed(20)
+    admission.acquire(2)
+    response = client.post('/api/requirements?limit=5', json={"requiredSkills": ["Python"]})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert admission.stats()['rejected'] == 1
+
+    admission.release(2)
+    response = client.post('/api/requirements?limit=5', json={"requiredSkills": ["Python"]})
+    assert response.status_code == 200
+    assert admission.stats()['inUse'] == 0
+
+def test_units_are_released_when_the_handler_fails(client, seed, admission, monkeypatch):
+    from backend.app.matching import MatchingEngine
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("scoring failed")
+
+    seed(20)
+    monkeypatch.setattr(MatchingEngine, 'find_matching_applicants_from_requirements', fail)
+    response = client.post('/api/requirements?limit=5', json={"requiredSkills": ["Python"]})
+    assert response.status_code == 500
+    assert admission.costs == [2]
+    assert admission.stats()['inUse'] == 0
+
+def test_streamed_response_releases_units_once_finished(client, seed, admission):
+    seed(20)
+    response = client.post('/api/requirements', json={"requiredSkills": ["Python"]},
+                           headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.get_data()
+    response.close()
+    assert admission.stats()['inUse'] == 0
+
+def test_job_matches_take_scoring_units_only_when_not_stored(client, seed, admission):
+    applicant_ids, job_ids = seed(20)
+    job_id = job_ids[0]
+
+    assert client.get(f'/api/job/{job_id}/matches?limit=5').status_code == 200
+    assert admission.costs == [1, 2]  # Admitted for a page, raised once the matches turned out missing
+    assert client.get(f'/api/job/{job_id}/matches?limit=5').status_code == 200
+    assert client.get(f'/api/job/{job_id}/matches?limit=5&refresh=1').status_code == 200
+    assert admission.costs == [1, 2, 1, 2]
+    assert admission.stats()['inUse'] == 0
+
+    # Turned away when the scoring pass does not fit
+    admission.acquire(1)
+    response = client.get(f'/api/job/{job_ids[1]}/matches?limit=5')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    admission.release(1)
+    assert admission.stats()['inUse'] == 0
@@ -0,0 +1,57 @@
+"""
+GET /api/applicants/<id>/matches ranks every job as scoring the applicant for each job one by one does
+"""
+
+def _expected(client, applicant_id, job_ids):
+    """Passing (job id, score) pairs from the per-job analysis endpoint, best first, then by job id"""
+    scores = [
+        (job_id, client.get(f'/api/job/{job_id}/matches/{applicant_id}/analysis').get_json()['matchScore'])
+        for job_id in job_ids
+    ]
+    return sorted([pair for pair in scores if pair[1] > 30], key=lambda pair: (-pair[1], pair[0]))
+
+def _scored(response):
+    return [(match['id'], match['matchScore']) for match in response.get_json()]
+
+def test_applicant_matches_agree_with_per_job_scores(client, seed):
+    applicant_ids, job_ids = seed(30, jobs=12)
+
+    for applicant_id in applicant_ids[:10]:
+        response = client.get(f'/api/applicants/{applicant_id}/matches?analysis=0')
+        assert response.status_code == 200
+        expected = _expected(client, applicant_id, job_ids)
+        assert _scored(response) == expected
+        assert int(response.headers['X-Total-Count']) == len(expected)
+
+def test_applicant_matches_pagination(client, seed):
+    applicant_ids, job_ids = seed(30, jobs=12)
+    applicant_id = max(applicant_ids, key=lambda applicant_id: len(_expected(client, applicant_id, job_ids)))
+    expected = _expected(client, applicant_id, job_ids)
+    assert len(expected) > 3
+
+    pages = [
+        client.get(f'/api/applicants/{applicant_id}/matches?limit=2&offset={offset}')
+        for offset in range(0, len(expected), 2)
+    ]
+    assert [pair for page in pages for pair in _scored(page)] == expected
+    assert all(int(page.headers['X-Total-Count']) == len(expected) for page in pages)
+    assert all(match['matchAnalysis'] is not None for page in pages for match in page.get_json())
+
+    response = client.get(f'/api/applicants/{applicant_id}/matches?offset={len(expected)}')
+    assert response.get_json() == []
+    assert client.get(f'/api/applicants/{applicant_id}/matches?limit=-1').status_code == 400
+
+def test_unknown_applicant_is_not_found(client, seed):
+    applicant_ids, job_ids = seed(5)
+    assert client.get(f'/api/applicants/{max(applicant_ids) + 1}/matches').status_code == 404
+
+def test_new_job_is_ranked(client, seed):
+    applicant_ids, job_ids = seed(10, jobs=2)
+    applicant_id = applicant_ids[0]
+    client.get(f'/api/applicants/{applicant_id}/matches')  # Builds the job index
+
+    response = client.post('/api/job', json={"jobTitle": "Anyone", "educationLevel": "High School"})
+    job_id = response.get_json()['id']
+    response = client.get(f'/api/applicants/{applicant_id}/matches?analysis=0')
+    assert _scored(response) == _expected(client, applicant_id, job_ids + [job_id])
+    assert job_id in [match['id'] for match in response.get_json()]
@@ -0,0 +1,138 @@
+"""
+Identical concurrent searches run the scorer once, and every caller gets its result or its error
+"""
+import threading
+import time
+import pytest
+
+def _run_concurrently(count, call):
+    """Start count threads running call(number), returning their results or exceptions in thread order"""
+    outcomes = [None] * count
+
+    def run(number):
+        try:
+            outcomes[number] = call(number)
+        except Exception as e:
+            outcomes[number] = e
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+def _wait_until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+
+def _wait_for_joiners(flights, count):
+    _wait_until(lambda: flights.stats()['coalesced'] >= count)
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_single_flight_shares_result_and_error(fails):
+    from backend.app.cache import SingleFlight
+
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait()
+        if fails:
+            raise RuntimeError("scoring failed")
+        return object()
+
+    threads, outcomes = _run_concurrently(4, lambda number: flights.do('key', compute))
+    _wait_for_joiners(flights, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    if fails:
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+        assert len({id(outcome) for outcome in outcomes}) == 1
+    else:
+        assert all(outcome is outcomes[0] for outcome in outcomes)
+    assert flights.stats() == {"inFlight": 0, "calls": 4, "coalesced": 3, "coalescedRate": 0.75}
+
+def test_concurrent_searches_score_once_and_share_sessions(session, seed, monkeypatch):
+    from backend.app.cache import requirement_flights, search_sessions
+    from backend.app.matching import MatchingEngine
+
+    seed(100)
+    requirements = {"educationLevel": "Bachelor's", "requiredSkills": ["Python", "SQL"], "preferredSkills": ["AWS"]}
+    release = threading.Event()
+    calls = []
+    score_session_plan = MatchingEngine.score_session_plan
+
+    def gated_score_session_plan(self, *args, **kwargs):
+        calls.append(1)
+        release.wait()
+        return score_session_plan(self, *args, **kwargs)
+
+    monkeypatch.setattr(MatchingEngine, 'score_session_plan', gated_score_session_plan)
+    coalesced = requirement_flights.stats()['coalesced']
+
+    def search(number):
+        matches, total, scanned = MatchingEngine().find_matching_applicants_from_requirements(
+            requirements, include_analysis=False, search_session=f'session-{number}'
+        )
+        return [(match['applicant'].id, match['match_score']) for match in matches], total
+
+    threads, outcomes = _run_concurrently(3, search)
+    _wait_for_joiners(requirement_flights, coalesced + 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert outcomes[0] == outcomes[1] == outcomes[2]
+    assert outcomes[0][1] > 0
+    # Every session holds the points of the one search that scored
+    entries = [search_sessions.get(f'session-{number}') for number in range(3)]
+    assert all(entry is entries[0] for entry in entries)
+
+def test_new_job_matches_are_stored_once(client, session, seed, monkeypatch):
+    from backend.app.cache import job_match_flights
+    from backend.app.matching import MatchingEngine
+    from backend.models.models import ApplicantMatch
+    from test_create_records import wait_for_tasks
+
+    seed(60)
+    release = threading.Event()
+    calls = []
+    refresh_job_matches = MatchingEngine.refresh_job_matches
+
+    def gated_refresh_job_matches(self, *args, **kwargs):
+        calls.append(1)
+        release.wait()
+        return refresh_job_matches(self, *args, **kwargs)
+
+    monkeypatch.setattr(MatchingEngine, 'refresh_job_matches', gated_refresh_job_matches)
+    coalesced = job_match_flights.stats()['coalesced']
+
+    response = client.post('/api/job', json={"jobTitle": "Engineer", "educationLevel": "High School", "requiredSkills": ["Python"]})
+    assert response.status_code == 200
+    job_id = response.get_json()['id']
+
+    # A request arriving while the job's task refreshes waits for that refresh
+    try:
+        _wait_until(lambda: calls)
+        threads, outcomes = _run_concurrently(1, lambda number: client.get(f'/api/job/{job_id}/matches?limit=5'))
+        _wait_for_joiners(job_match_flights, coalesced + 1)
+    finally:
+        release.set()
+    threads[0].join()
+    assert wait_for_tasks(session) == {('job_matches', 'done')}
+
+    stored = session.query(ApplicantMatch).filter(ApplicantMatch.job_id == job_id).count()
+    assert outcomes[0].status_code == 200
+    assert int(outcomes[0].headers['X-Total-Count']) == stored > 0
+
+    # Once stored, the matches are not refreshed again unless asked to
+    MatchingEngine().store_job_matches(job_id)
+    assert len(calls) == 1
+    MatchingEngine().store_job_matches(job_id, refresh=True)
+    assert len(calls) == 2
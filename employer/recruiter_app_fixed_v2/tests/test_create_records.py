@@ -0,0 +1,67 @@
+"""
+Creating a job or an applicant succeeds once committed, whatever happens to the matching data derived from it
+"""
+import time
+
+def wait_for_tasks(session, timeout=10):
+    """Wait until every match task is done or failed and return their statuses by kind"""
+    from backend.models.models import MatchTask
+    deadline = time.monotonic() + timeout
+    while True:
+        session.expire_all()
+        tasks = session.query(MatchTask).all()
+        if all(task.status in ('done', 'failed') for task in tasks) or time.monotonic() > deadline:
+            return {(task.kind, task.status) for task in tasks}
+        time.sleep(0.02)
+
+def test_create_job_stores_matches_in_background(client, session, seed):
+    from backend.models.models import JobMatchStatus, ApplicantMatch
+
+    seed(40)
+    response = client.post('/api/job', json={"jobTitle": "Engineer", "educationLevel": "High School", "requiredSkills": ["Python"]})
+    assert response.status_code == 200
+    job_id = response.get_json()['id']
+
+    assert wait_for_tasks(session) == {('job_matches', 'done')}
+    assert session.get(JobMatchStatus, job_id) is not None
+    stored = session.query(ApplicantMatch).filter(ApplicantMatch.job_id == job_id).count()
+    assert int(client.get(f'/api/job/{job_id}/matches?limit=1').headers['X-Total-Count']) == stored
+
+def test_create_job_survives_failing_index_update(client, session, seed, monkeypatch):
+    from backend.app import job_index
+    from backend.models.models import JobPosition, JobMatchStatus
+
+    def fail():
+        raise RuntimeError("index unavailable")
+
+    seed(10)
+    monkeypatch.setattr(job_index, 'invalidate_job_index', fail)
+    response = client.post('/api/job', json={"jobTitle": "Engineer", "requiredSkills": ["SQL"]})
+    assert response.status_code == 200
+    job_id = response.get_json()['id']
+    assert session.get(JobPosition, job_id) is not None
+    assert wait_for_tasks(session) == {('job_matches', 'done')}
+    assert session.get(JobMatchStatus, job_id) is not None
+
+def test_create_applicant_survives_failing_index_update(client, session, seed, monkeypatch):
+    from backend.app import index
+    from backend.models.models import Applicant
+
+    def fail(applicant):
+        raise RuntimeError("snapshot unavailable")
+
+    seed(10)
+    monkeypatch.setattr(index, 'index_applicant', fail)
+    response = client.post('/api/applicants', json={
+        "name": "New Applicant", "email": "new@example.com", "educationLevel": "PhD",
+        "experienceYears": 9, "skills": ["Rust"]
+    })
+    assert response.status_code == 200
+    applicant_id = response.get_json()['id']
+    assert session.get(Applicant, applicant_id) is not None
+    assert wait_for_tasks(session) == {('applicant_matches', 'done')}
+
+    # The unacknowledged data version makes the next request catch the index up
+    response = client.post('/api/requirements?analysis=0', json={"requiredSkills": ["Rust"]})
+    assert response.status_code == 200
+    assert [match['id'] for match in response.get_json()] == [applicant_id]
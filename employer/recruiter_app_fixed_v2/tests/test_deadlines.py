@@ -0,0 +1,66 @@
+"""
+A deadline that runs out mid-scan returns the matches of the candidates scored so far, marked incomplete
+"""
+import itertools
+from types import SimpleNamespace
+import pytest
+
+REQUIREMENTS = {"educationLevel": "High School", "experienceYears": 2, "requiredSkills": ["Python", "SQL"]}
+
+@pytest.fixture
+def slow_clock(monkeypatch):
+    """Scoring in blocks of 10 candidates, with a clock advancing a second per reading: a deadline stops after one block"""
+    from backend.app import matching
+    clock = itertools.count()
+    monkeypatch.setattr(matching, 'time', SimpleNamespace(monotonic=lambda: float(next(clock))))
+    monkeypatch.setattr(matching, 'DEADLINE_BLOCK_SIZE', 10)
+
+def _scored(response):
+    return [(match['id'], match['matchScore']) for match in response.get_json()]
+
+def test_search_deadline_returns_first_block(client, session, seed, slow_clock):
+    from backend.app.index import get_applicant_index
+    from backend.app.plans import RequirementPlan
+
+    seed(100)
+    response = client.post('/api/requirements?analysis=0&deadline_ms=500', json=REQUIREMENTS)
+    assert response.status_code == 200
+    assert response.headers['X-Match-Complete'] == 'false'
+    assert response.headers['X-Match-Scanned'] == '0.1000'
+    partial = _scored(response)
+    assert int(response.headers['X-Total-Count']) == len(partial)
+
+    # The block holds the candidates with the most required skills, scored exactly
+    index = get_applicant_index(session)
+    plan = RequirementPlan.from_requirements(REQUIREMENTS, index)
+    held = dict(zip(index.ids.tolist(), index.skill_membership.count_matches(plan.required_skill_ids, slice(None)).tolist()))
+    scores = dict(zip(index.ids.tolist(), index.score_plan(plan).tolist()))
+    assert partial and all(scores[applicant_id] == score for applicant_id, score in partial)
+    assert min(held[applicant_id] for applicant_id, _ in partial) >= sorted(held.values(), reverse=True)[9]
+
+    # Incomplete results are not cached: the next search without a deadline scores everyone
+    response = client.post('/api/requirements?analysis=0', json=REQUIREMENTS)
+    assert response.headers['X-Match-Complete'] == 'true'
+    assert response.headers['X-Match-Scanned'] == '1.0000'
+    complete = _scored(response)
+    assert set(partial) < set(complete)
+
+def test_job_deadline_does_not_store_partial_matches(client, session, seed, slow_clock):
+    from backend.models.models import JobMatchStatus
+
+    applicant_ids, job_ids = seed(100, jobs=1)
+    job_id = job_ids[0]
+    response = client.get(f'/api/job/{job_id}/matches?analysis=0&deadline_ms=500')
+    assert response.status_code == 200
+    assert response.headers['X-Match-Complete'] == 'false'
+    assert float(response.headers['X-Match-Scanned']) < 1.0
+    assert session.get(JobMatchStatus, job_id) is None
+
+    response = client.get(f'/api/job/{job_id}/matches?analysis=0')
+    assert response.headers['X-Match-Complete'] == 'true'
+    assert session.get(JobMatchStatus, job_id) is not None
+
+@pytest.mark.parametrize("deadline_ms", ["0", "-5", "soon"])
+def test_invalid_deadline_is_bad_request(client, deadline_ms):
+    response = client.post(f'/api/requirements?deadline_ms={deadline_ms}', json=REQUIREMENTS)
+    assert response.status_code == 400
@@ -0,0 +1,64 @@
+"""
+Stored job matches stay complete when applicants are added while a job is being scored
+"""
+import pytest
+
+@pytest.fixture(params=['index', 'sql'])
+def engine_with_job(request, session, seed, monkeypatch):
+    """A MatchingEngine on the given backend and the id of a job every applicant with Python matches well"""
+    from backend.app import matching
+    from backend.models.models import JobPosition, JobRequirement, Skill
+
+    monkeypatch.setattr(matching, 'MATCHING_BACKEND', request.param)
+    seed(50)
+    job = JobPosition(title='Python Developer')
+    job.requirements = JobRequirement(min_education_level='High School', min_experience_years=1)
+    job.required_skills = [session.query(Skill).filter(Skill.name == 'Python').one()]
+    session.add(job)
+    session.commit()
+    return matching.MatchingEngine(), job.id
+
+def add_python_applicant(session):
+    from backend.models.models import Applicant, Skill
+
+    applicant = Applicant(name='Late Applicant', email='late@example.com', education_level='PhD', experience_years=8)
+    applicant.skills = [session.query(Skill).filter(Skill.name == 'Python').one()]
+    session.add(applicant)
+    session.commit()
+    return applicant.id
+
+def stored_score(session, job_id, applicant_id):
+    from backend.models.models import ApplicantMatch
+
+    session.expire_all()
+    match = session.query(ApplicantMatch).filter_by(job_id=job_id, applicant_id=applicant_id).one_or_none()
+    return match and match.match_score
+
+def test_refresh_keeps_matches_stored_by_applicant_tasks_meanwhile(engine_with_job, session):
+    from backend.models.models import JobPosition
+
+    matching_engine, job_id = engine_with_job
+    matching_engine.refresh_job_matches(job_id)
+    scored = matching_engine._score_job_snapshot(matching_engine.session.get(JobPosition, job_id))
+
+    # The applicant_matches task of an applicant committed after the scoring runs before the refresh stores
+    applicant_id = add_python_applicant(session)
+    matching_engine.refresh_applicant_matches(applicant_id)
+    assert stored_score(session, job_id, applicant_id) == 100
+
+    matching_engine.refresh_job_matches(job_id, scored=scored)
+    assert stored_score(session, job_id, applicant_id) == 100
+
+def test_first_refresh_scores_applicants_committed_after_its_scoring(engine_with_job, session):
+    from backend.models.models import JobPosition
+
+    matching_engine, job_id = engine_with_job
+    scored = matching_engine._score_job_snapshot(matching_engine.session.get(JobPosition, job_id))
+
+    # The task runs while the job is not marked as scored yet, so it skips the job
+    applicant_id = add_python_applicant(session)
+    matching_engine.refresh_applicant_matches(applicant_id)
+    assert stored_score(session, job_id, applicant_id) is None
+
+    matching_engine.refresh_job_matches(job_id, scored=scored)
+    assert stored_score(session, job_id, applicant_id) == 100
@@ -0,0 +1,51 @@
+"""
+POST /api/jobs/matches returns for each job what GET /api/job/<id>/matches does
+"""
+import pytest
+
+def _scored(matches):
+    return [(match['id'], match['matchScore']) for match in matches]
+
+def test_batch_matches_agree_with_job_matches(client, seed):
+    applicant_ids, job_ids = seed(150, jobs=4)
+
+    response = client.post('/api/jobs/matches?analysis=0', json={"jobIds": job_ids, "limit": 7})
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [result['jobId'] for result in results] == job_ids
+    assert any(result['total'] > 7 for result in results)
+    for result in results:
+        single = client.get(f"/api/job/{result['jobId']}/matches?analysis=0&limit=7")
+        assert result['total'] == int(single.headers['X-Total-Count'])
+        assert _scored(result['matches']) == _scored(single.get_json())
+        assert all(match['matchAnalysis'] is None for match in result['matches'])
+
+def test_batch_limits_and_unknown_ids(client, seed):
+    applicant_ids, job_ids = seed(80, jobs=3)
+    unknown = max(job_ids) + 100
+
+    # Unknown ids are left out and repeated ids answered once, in request order
+    response = client.post('/api/jobs/matches', json={"jobIds": [job_ids[2], unknown, job_ids[0], job_ids[2]], "limit": None})
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [result['jobId'] for result in results] == [job_ids[2], job_ids[0]]
+    for result in results:
+        assert len(result['matches']) == result['total']
+        assert all(match['matchAnalysis'] is not None for match in result['matches'])
+
+    response = client.post('/api/jobs/matches', json={"jobIds": [job_ids[0]], "limit": 0})
+    assert response.get_json()[0]['matches'] == []
+    assert response.get_json()[0]['total'] == results[1]['total']
+    assert client.post('/api/jobs/matches', json={"jobIds": [unknown]}).get_json() == []
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"jobIds": []},
+    {"jobIds": [1, "2"]},
+    {"jobIds": [True]},
+    {"jobIds": list(range(1, 102))},
+    {"jobIds": [1], "limit": -1},
+    {"jobIds": [1], "limit": "5"},
+])
+def test_invalid_batch_is_bad_request(client, body):
+    assert client.post('/api/jobs/matches', json=body).status_code == 400
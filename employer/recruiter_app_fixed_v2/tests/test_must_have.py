@@ -0,0 +1,44 @@
+"""
+Must-have criteria with values of the wrong type are rejected as bad requests
+"""
+import pytest
+
+@pytest.mark.parametrize("requirements", [
+    {"experienceYears": "3", "mustHave": ["experienceYears"]},
+    {"experienceYears": True, "mustHave": ["experienceYears"]},
+    {"maxSalary": "100000", "mustHave": ["maxSalary"]},
+    {"maxSalary": [100000], "mustHave": ["maxSalary"]},
+])
+def test_non_numeric_must_have_is_bad_request(client, seed, matching_backend, requirements):
+    seed(10)
+    response = client.post('/api/requirements', json=requirements)
+    assert response.status_code == 400
+    assert 'must be a number' in response.get_json()['error']
+
+@pytest.mark.parametrize("requirements", [
+    {"requiredSkills": [["Python"]], "mustHave": ["requiredSkills"]},
+    {"requiredSkills": "Python", "mustHave": ["requiredSkills"]},
+    {"requiredSkills": ["Python", 3], "mustHave": ["requiredSkills"]},
+    {"requiredCertifications": {"name": "PMP"}, "mustHave": ["requiredCertifications"]},
+    {"requiredCertifications": "PMP", "mustHave": ["requiredCertifications"]},
+])
+def test_non_list_must_have_is_bad_request(client, seed, matching_backend, requirements):
+    seed(10)
+    response = client.post('/api/requirements', json=requirements)
+    assert response.status_code == 400
+    assert 'must be a list of names' in response.get_json()['error']
+
+def test_numeric_must_have_filters_applicants(client, session, seed):
+    from backend.models.models import Applicant
+
+    seed(40)
+    response = client.post('/api/requirements?analysis=0', json={
+        "requiredSkills": ["Python"], "experienceYears": 5, "maxSalary": 100000,
+        "mustHave": ["experienceYears", "maxSalary"]
+    })
+    assert response.status_code == 200
+    assert response.get_json()
+    for match in response.get_json():
+        applicant = session.get(Applicant, match['id'])
+        assert applicant.experience_years >= 5
+        assert applicant.desired_salary is None or applicant.desired_salary <= 100000
@@ -0,0 +1,27 @@
+"""
+Match lists reject limit and offset values that are not non-negative integers
+"""
+import pytest
+
+@pytest.mark.parametrize("query", ["limit=abc", "offset=abc", "limit=2.5", "limit=", "limit=-1", "offset=-3", "limit=5&offset=x"])
+def test_bad_pagination_is_bad_request(client, seed, query):
+    applicant_ids, job_ids = seed(10)
+    for response in (
+        client.post(f'/api/requirements?{query}', json={"requiredSkills": ["Python"]}),
+        client.get(f'/api/job/{job_ids[0]}/matches?{query}'),
+        client.get(f'/api/applicants/{applicant_ids[0]}/matches?{query}'),
+    ):
+        assert response.status_code == 400
+        assert response.get_json()['error'] == "limit and offset must be non-negative integers"
+
+def test_pages_cover_every_match(client, seed):
+    seed(60)
+    search = {"requiredSkills": ["Python"], "educationLevel": "High School"}
+    everything = client.post('/api/requirements?analysis=0', json=search).get_json()
+    assert len(everything) > 4
+    pages = [
+        client.post(f'/api/requirements?analysis=0&limit=4&offset={offset}', json=search).get_json()
+        for offset in range(0, len(everything), 4)
+    ]
+    assert [match['id'] for page in pages for match in page] == [match['id'] for match in everything]
+    assert client.post('/api/requirements?analysis=0&limit=0', json=search).get_json() == []
@@ -0,0 +1,67 @@
+"""
+Sharded scoring across worker processes returns exactly what in-process scoring does
+"""
+import numpy as np
+import pytest
+
+REQUIREMENTS = [
+    {"educationLevel": "Bachelor's", "experienceYears": 3, "requiredSkills": ["Python", "SQL"],
+     "preferredSkills": ["AWS"], "locationPreference": "Remote", "minSalary": 70000, "maxSalary": 140000},
+    {"educationLevel": "High School"},
+    {"requiredSkills": ["Docker"], "requiredCertifications": ["PMP"]},
+]
+
+@pytest.fixture
+def sharded_scorer():
+    from backend.app.parallel import ShardedScorer
+    scorer = ShardedScorer(3)
+    yield scorer
+    scorer.shutdown()
+
+def test_shards_score_like_the_index(session, seed, sharded_scorer):
+    from backend.app.index import ApplicantIndex
+    from backend.app.plans import RequirementPlan
+
+    seed(301)
+    index = ApplicantIndex(session)
+    rows = np.arange(0, len(index), 7)
+    for requirements in REQUIREMENTS:
+        plan = RequirementPlan.from_requirements(requirements, index)
+        assert np.array_equal(sharded_scorer.score(index, plan), index.score_plan(plan))
+        assert np.array_equal(sharded_scorer.score(index, plan, rows), index.score_plan(plan, rows))
+
+    # Shards are sent again once the index changes
+    seed(40, jobs=0, seed=2)
+    assert index.catch_up(session) == 40
+    plan = RequirementPlan.from_requirements(REQUIREMENTS[0], index)
+    assert np.array_equal(sharded_scorer.score(index, plan), index.score_plan(plan))
+
+def test_sharded_matches_keep_order_and_ties(client, seed, monkeypatch):
+    from backend.app import parallel
+    from backend.app.cache import requirements_cache
+
+    seed(301)
+    in_process = [
+        client.post('/api/requirements?analysis=0', json=requirements).get_json()
+        for requirements in REQUIREMENTS
+    ]
+
+    requirements_cache.invalidate()
+    monkeypatch.setattr(parallel, 'PARALLEL_WORKERS', 3)
+    monkeypatch.setattr(parallel, 'PARALLEL_THRESHOLD', 1)
+    try:
+        sharded = [
+            client.post('/api/requirements?analysis=0', json=requirements).get_json()
+            for requirements in REQUIREMENTS
+        ]
+        assert parallel._scorer is not None
+    finally:
+        parallel.reset_sharded_scorer()
+
+    assert sharded == in_process
+    # Equal scores spanning shards come back by applicant id
+    scores = [match['matchScore'] for match in sharded[1]]
+    assert len(set(scores)) < len(scores)
+    assert [(-match['matchScore'], match['id']) for match in sharded[1]] == sorted(
+        (-match['matchScore'], match['id']) for match in sharded[1]
+    )
@@ -0,0 +1,71 @@
+"""
+Read paths issue a fixed number of queries however many applicants they return
+"""
+from sqlalchemy import event
+
+# name -> request of one read path, given the test client, a job id and an applicant id
+READ_PATHS = {
+    "applicants": lambda client, job_id, applicant_id: client.get('/api/applicants'),
+    "applicant": lambda client, job_id, applicant_id: client.get(f'/api/applicants/{applicant_id}'),
+    "requirements": lambda client, job_id, applicant_id: client.post('/api/requirements', json={
+        "educationLevel": "High School", "requiredSkills": ["Python", "SQL"], "locationPreference": "Remote"
+    }),
+    "job_matches": lambda client, job_id, applicant_id: client.get(f'/api/job/{job_id}/matches'),
+    "job_matches_refresh": lambda client, job_id, applicant_id: client.get(f'/api/job/{job_id}/matches?refresh=1'),
+    "jobs_matches": lambda client, job_id, applicant_id: client.post('/api/jobs/matches', json={"jobIds": [job_id], "limit": None}),
+    "applicant_matches": lambda client, job_id, applicant_id: client.get(f'/api/applicants/{applicant_id}/matches'),
+    "match_analysis": lambda client, job_id, applicant_id: client.get(f'/api/job/{job_id}/matches/{applicant_id}/analysis'),
+}
+
+def count_queries(engine, request):
+    """Run request and return its response and the number of SQL statements it executed"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = request()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_json()
+    return response, len(statements)
+
+def read_path_queries(engine, client, job_id, applicant_id):
+    """Query count and result size of every read path, on warm indexes and a cold result cache"""
+    from backend.app.cache import requirements_cache
+
+    for read_path in READ_PATHS.values():
+        read_path(client, job_id, applicant_id)
+    requirements_cache.invalidate()
+
+    counts = {}
+    sizes = {}
+    for name, read_path in READ_PATHS.items():
+        response, counts[name] = count_queries(engine, lambda: read_path(client, job_id, applicant_id))
+        sizes[name] = len(response.get_data())
+    return counts, sizes
+
+def test_read_paths_issue_fixed_query_counts(engine, client, session, seed):
+    from backend.app.index import invalidate_applicant_index
+    from backend.app.job_index import invalidate_job_index
+    from backend.models.models import JobRequirement
+
+    applicant_ids, job_ids = seed(25, jobs=3, seed=1)
+    job_id = job_ids[0]
+    requirements = session.query(JobRequirement).filter(JobRequirement.job_id == job_id).one()
+    requirements.min_education_level = None
+    requirements.location_preference = None
+    session.commit()
+    small, small_sizes = read_path_queries(engine, client, job_id, applicant_ids[0])
+
+    # Ten times the applicants, added behind the indexes' back, which are rebuilt
+    seed(250, jobs=0, seed=2)
+    invalidate_applicant_index()
+    invalidate_job_index()
+    large, large_sizes = read_path_queries(engine, client, job_id, applicant_ids[0])
+
+    assert large == small
+    for name in ("applicants", "requirements", "job_matches", "jobs_matches"):
+        assert large_sizes[name] > 2 * small_sizes[name], name
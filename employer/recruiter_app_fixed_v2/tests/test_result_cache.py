@@ -0,0 +1,96 @@
+"""
+ResultCache eviction, invalidation on data version bumps, and the counters reported by /api/metrics
+"""
+from types import SimpleNamespace
+import numpy as np
+
+SEARCH = {"requiredSkills": ["Python"], "educationLevel": "High School"}
+
+def test_entries_expire_after_ttl(monkeypatch):
+    from backend.app import cache
+
+    now = [0.0]
+    monkeypatch.setattr(cache, 'time', SimpleNamespace(monotonic=lambda: now[0]))
+    results = cache.ResultCache(max_entries=4, ttl=10)
+    results.set('a', 1)
+    now[0] = 9.9
+    assert results.get('a') == 1
+    now[0] = 10.0
+    assert results.get('a') is None
+    assert results.stats() | {"ttlSeconds": None} == {
+        "size": 0, "maxEntries": 4, "bytes": 0, "maxBytes": None, "ttlSeconds": None,
+        "hits": 1, "misses": 1, "hitRate": 0.5, "evictions": 0, "expirations": 1,
+    }
+
+def test_least_recently_used_entry_is_evicted():
+    from backend.app.cache import ResultCache
+
+    results = ResultCache(max_entries=2)
+    results.set('a', 1)
+    results.set('b', 2)
+    assert results.get('a') == 1  # b is now the least recently used
+    results.set('c', 3)
+    assert results.get('b') is None
+    assert results.get('a') == 1 and results.get('c') == 3
+    assert results.stats()['evictions'] == 1
+
+def test_byte_bound_counts_replaced_and_oversized_values():
+    from backend.app.cache import ResultCache
+
+    results = ResultCache(max_entries=None, max_bytes=100)
+    results.set('a', (np.zeros(40, dtype=np.uint8), np.zeros(5, dtype=np.int64)))
+    results.set('a', np.zeros(60, dtype=np.uint8))  # Replacing an entry gives its bytes back
+    assert results.stats()['bytes'] == 60
+    results.set('b', {'points': [np.zeros(30, dtype=np.uint8)]})
+    assert results.stats()['bytes'] == 90
+    results.set('c', np.zeros(20, dtype=np.uint8))
+    assert results.get('a') is None and results.stats()['bytes'] == 50
+    results.set('d', np.zeros(101, dtype=np.uint8))  # Larger than the bound: kept by nothing
+    assert results.stats()['size'] == 0 and results.stats()['bytes'] == 0
+
+def test_stale_generation_is_not_stored():
+    from backend.app.cache import ResultCache
+
+    results = ResultCache()
+    generation = results.generation
+    results.invalidate()
+    results.set('a', 1, generation)
+    assert results.get('a') is None
+
+def test_version_bump_from_another_process_clears_results(client, session, seed):
+    from backend.app.cache import requirements_cache
+    from backend.app.versions import APPLICANTS, bump_data_version
+    from backend.models.models import Applicant, Skill
+
+    seed(30)
+    client.get('/api/metrics')  # The first check only records the versions
+    assert client.post('/api/requirements?analysis=0', json=SEARCH).status_code == 200
+    assert requirements_cache.stats()['size'] == 1
+
+    # Another worker adds an applicant with Python, bumping the applicants version with it
+    applicant = Applicant(name='Elsewhere', email='elsewhere@example.com', education_level='PhD', experience_years=5)
+    applicant.skills = [session.query(Skill).filter(Skill.name == 'Python').one()]
+    session.add(applicant)
+    bump_data_version(session, APPLICANTS)
+    session.commit()
+
+    response = client.post('/api/requirements?analysis=0', json=SEARCH)
+    assert applicant.id in [match['id'] for match in response.get_json()]
+    assert requirements_cache.stats()['size'] == 1
+
+def test_metrics_report_cache_counters(client, seed):
+    seed(30)
+    before = client.get('/api/metrics').get_json()
+    for _ in range(3):
+        client.post('/api/requirements?analysis=0', json=SEARCH)
+    client.post('/api/requirements?analysis=0', json={"requiredSkills": ["SQL"]})
+    after = client.get('/api/metrics').get_json()
+
+    cache_before, cache_after = before['requirementsCache'], after['requirementsCache']
+    assert cache_after['hits'] - cache_before['hits'] == 2
+    assert cache_after['misses'] - cache_before['misses'] == 2
+    assert cache_after['size'] == 2
+    assert cache_after['hitRate'] == round(cache_after['hits'] / (cache_after['hits'] + cache_after['misses']), 4)
+    coalescing = after['coalescing']['requirements']
+    assert coalescing['calls'] - before['coalescing']['requirements']['calls'] == 2
+    assert after['admission']['inUse'] == 0
@@ -0,0 +1,62 @@
+"""
+init_db upgrades applicant_matches tables created before the unique (applicant_id, job_id) index
+"""
+from sqlalchemy import inspect, text
+
+# applicant_matches as created by the bundled recruiter.db
+OLD_APPLICANT_MATCHES = """
+CREATE TABLE applicant_matches (
+    id INTEGER NOT NULL,
+    job_id INTEGER,
+    applicant_id INTEGER,
+    match_score FLOAT,
+    match_date DATE,
+    notes TEXT,
+    PRIMARY KEY (id),
+    FOREIGN KEY(job_id) REFERENCES job_positions (id),
+    FOREIGN KEY(applicant_id) REFERENCES applicants (id)
+)
+"""
+
+def _replace_with_old_table(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE applicant_matches"))
+        connection.execute(text(OLD_APPLICANT_MATCHES))
+        for row in rows:
+            connection.execute(text(
+                "INSERT INTO applicant_matches (job_id, applicant_id, match_score) VALUES (:job_id, :applicant_id, :match_score)"
+            ), row)
+
+def test_upgrade_deduplicates_and_adds_unique_index(engine):
+    from backend.database.db import init_db
+
+    _replace_with_old_table(engine, [
+        {"job_id": 1, "applicant_id": 1, "match_score": 40},
+        {"job_id": 1, "applicant_id": 1, "match_score": 55},
+        {"job_id": 1, "applicant_id": 2, "match_score": 70},
+    ])
+    init_db()
+    init_db()  # A second run finds nothing to do
+
+    indexes = {index['name']: index for index in inspect(engine).get_indexes('applicant_matches')}
+    assert indexes['uq_applicant_matches_applicant_job']['unique']
+    assert 'ix_applicant_matches_job_score' in indexes
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT job_id, applicant_id, match_score FROM applicant_matches ORDER BY applicant_id"
+        )).all()
+    assert [tuple(row) for row in rows] == [(1, 1, 55), (1, 2, 70)]
+
+def test_job_matches_work_on_upgraded_table(engine, client, seed):
+    from backend.database.db import init_db
+
+    seed(30)
+    _replace_with_old_table(engine, [])
+    init_db()
+
+    response = client.post('/api/job', json={"jobTitle": "Engineer", "educationLevel": "High School", "requiredSkills": ["Python"]})
+    assert response.status_code == 200
+    job_id = response.get_json()['id']
+    response = client.get(f'/api/job/{job_id}/matches?limit=5')
+    assert response.status_code == 200
+    assert int(response.headers['X-Total-Count']) > 0
@@ -0,0 +1,47 @@
+"""
+Search sessions keep compact per-criterion results, bounded by bytes, and score exactly like fresh searches
+"""
+import numpy as np
+
+SEARCHES = [
+    {"educationLevel": "Bachelor's", "experienceYears": 3, "requiredSkills": ["Python", "SQL"],
+     "preferredSkills": ["AWS"], "locationPreference": "Remote", "minSalary": 70000, "maxSalary": 130000},
+    {"educationLevel": "Bachelor's", "experienceYears": 7, "requiredSkills": ["Python", "SQL"],
+     "preferredSkills": ["AWS"], "locationPreference": "Remote", "minSalary": 70000, "maxSalary": 130000},
+    {"educationLevel": "Bachelor's", "experienceYears": 7, "requiredSkills": ["Python", "SQL"],
+     "preferredSkills": ["AWS", "Docker"], "requiredCertifications": ["PMP"], "locationPreference": "Remote",
+     "minSalary": 90000, "maxSalary": 110000},
+]
+
+def test_session_scores_match_fresh_scores(session, seed):
+    from backend.app.index import get_applicant_index
+    from backend.app.matching import MatchingEngine
+    from backend.app.plans import RequirementPlan
+    from backend.app.cache import search_sessions
+
+    seed(200)
+    engine = MatchingEngine()
+    index = get_applicant_index(session)
+    for requirements in SEARCHES:
+        plan = RequirementPlan.from_requirements(requirements, index)
+        ids, scores = engine.score_session_plan(plan, 'session-1', index)
+        passing = index.score_plan(plan) > 30
+        assert np.array_equal(ids, index.ids[passing])
+        assert np.array_equal(scores, index.score_plan(plan)[passing])
+
+    entry = search_sessions.get('session-1')
+    for name, (key, values) in entry['components'].items():
+        assert values is None or values.dtype == np.uint8, name
+    assert search_sessions.stats()['bytes'] == 5 * len(index)
+
+def test_sessions_are_bounded_by_bytes():
+    from backend.app.cache import ResultCache
+
+    cache = ResultCache(max_entries=None, max_bytes=2500)
+    for number in range(4):
+        cache.set(number, {'components': {'education': (None, np.zeros(1000, dtype=np.uint8))}})
+    assert cache.get(0) is None and cache.get(1) is None
+    assert cache.get(3) is not None
+    assert cache.stats()['bytes'] == 2000
+    cache.invalidate()
+    assert cache.stats()['bytes'] == 0
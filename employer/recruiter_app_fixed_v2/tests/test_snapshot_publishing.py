@@ -0,0 +1,55 @@
+"""
+The shared applicant snapshot is published by the background task of a new applicant, never by its request
+"""
+import os
+from test_create_records import wait_for_tasks
+
+NEW_APPLICANT = {
+    "name": "New Applicant", "email": "new@example.com", "educationLevel": "PhD",
+    "experienceYears": 9, "skills": ["Rust"]
+}
+
+def _use_snapshot(monkeypatch, tmp_path):
+    from backend.app import snapshot
+    path = str(tmp_path / 'applicants.snap')
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_PATH', path)
+    return path
+
+def test_task_publishes_snapshot(client, session, seed, monkeypatch, tmp_path):
+    from backend.app import tasks
+    from backend.app.snapshot import read_snapshot
+
+    path = _use_snapshot(monkeypatch, tmp_path)
+    seed(20)
+    assert client.post('/api/requirements?analysis=0', json={"requiredSkills": ["Rust"]}).get_json() == []
+    assert read_snapshot(path).generation == 1
+
+    queued = []
+    monkeypatch.setattr(tasks, 'run_task', queued.append)
+    response = client.post('/api/applicants', json=NEW_APPLICANT)
+    assert response.status_code == 200
+    applicant_id = response.get_json()['id']
+    assert read_snapshot(path).generation == 1  # Untouched by the request
+
+    tasks.get_task_runner().submit(queued[0])
+    assert wait_for_tasks(session) == {('applicant_matches', 'done')}
+    snapshot = read_snapshot(path)
+    assert snapshot.generation == 2 and applicant_id in snapshot.ids.tolist()
+    response = client.post('/api/requirements?analysis=0', json={"requiredSkills": ["Rust"]})
+    assert [match['id'] for match in response.get_json()] == [applicant_id]
+
+def test_sql_backend_builds_no_snapshot(client, session, seed, monkeypatch, tmp_path):
+    from backend.app import matching
+
+    path = _use_snapshot(monkeypatch, tmp_path)
+    monkeypatch.setattr(matching, 'MATCHING_BACKEND', 'sql')
+    seed(20)
+    response = client.post('/api/applicants', json=NEW_APPLICANT)
+    assert response.status_code == 200
+    applicant_id = response.get_json()['id']
+    assert wait_for_tasks(session) == {('applicant_matches', 'done')}
+    assert not os.path.exists(path)
+
+    response = client.post('/api/requirements?analysis=0', json={"requiredSkills": ["Rust"]})
+    assert [match['id'] for match in response.get_json()] == [applicant_id]
+    assert not os.path.exists(path)
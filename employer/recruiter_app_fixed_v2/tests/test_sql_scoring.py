@@ -0,0 +1,122 @@
+"""
+The SQL backend scores exactly like RequirementPlan.score and ApplicantIndex on the same data
+"""
+import pytest
+
+# 15 of 40 points for the "tie-up" applicant and 26 of 80 for "tie-down": percentages ending in .5
+TIE_UP = {"educationLevel": "PhD", "experienceYears": 3}
+TIE_DOWN = {
+    "educationLevel": "Master's", "experienceYears": 2, "requiredSkills": ["Java"],
+    "preferredSkills": ["AWS", "Docker", "Python", "React", "SQL"]
+}
+
+REQUIREMENTS = [
+    TIE_UP,
+    TIE_DOWN,
+    {"educationLevel": "Bachelor's", "experienceYears": 3, "requiredSkills": ["Python", "SQL"],
+     "preferredSkills": ["AWS"], "locationPreference": "Remote", "minSalary": 70000, "maxSalary": 140000},
+    {"educationLevel": "Master's", "experienceYears": 4, "requiredSkills": ["Java"],
+     "preferredSkills": ["Python", "SQL", "AWS", "Docker", "Unknown"]},
+    {"experienceYears": 0, "requiredSkills": ["Python", "Python", "Unknown"], "requiredCertifications": ["PMP", "Unknown"]},
+    {"educationLevel": "Doctorate", "requiredSkills": ["React"], "locationPreference": "New York, NY", "relocationRequired": True},
+    {"requiredSkills": ["Docker", "AWS"], "minSalary": 90000, "maxSalary": 100000},
+    {"requiredSkills": ["SQL"], "minSalary": 0, "maxSalary": 0},
+    {"requiredSkills": ["Unknown"], "preferredSkills": ["Unknown"]},
+    {"locationPreference": "CA", "relocationRequired": True, "experienceYears": 10},
+]
+
+# name -> (education, experience, salary, location, skills): scores that land on a .5 tie, and salary edges
+EDGE_APPLICANTS = {
+    "tie-up": ("High School", 3, None, None, []),
+    "tie-down": ("Master's", 1, None, None, ["AWS", "Docker", "Python"]),
+    "salary-min": ("PhD", 12, 70000, "Remote", ["Python", "SQL"]),
+    "salary-max": ("PhD", 12, 140000, "Remote", ["Python", "SQL"]),
+    "salary-above": ("PhD", 12, 154000, "Remote", ["Python", "SQL"]),
+    "salary-below": ("PhD", 12, 0, "Remote", ["Python", "SQL"]),
+    "salary-far-above": ("PhD", 12, 500000, "Remote", ["Python", "SQL"]),
+}
+
+@pytest.fixture
+def applicants(session, seed):
+    from backend.models.models import Applicant, Skill
+
+    seed(300, jobs=4, seed=15)
+    skills = {skill.name: skill for skill in session.query(Skill)}
+    edge = {}
+    for name, (education, experience, salary, location, skill_names) in EDGE_APPLICANTS.items():
+        applicant = Applicant(
+            name=name, email=f'{name}@example.com', education_level=education, experience_years=experience,
+            desired_salary=salary, location=location, willing_to_relocate=False
+        )
+        applicant.skills = [skills[skill] for skill in skill_names]
+        session.add(applicant)
+        edge[name] = applicant
+    session.commit()
+    return {name: applicant.id for name, applicant in edge.items()}
+
+def _plans(session, index):
+    """(index plan, SQL plan) pairs of every requirements dictionary and every job"""
+    from backend.app.plans import RequirementPlan
+    from backend.app.sql_scoring import SqlCatalog
+    from backend.models.models import JobPosition
+
+    plans = [
+        (RequirementPlan.from_requirements(requirements, index), RequirementPlan.from_requirements(requirements, SqlCatalog(session)))
+        for requirements in REQUIREMENTS
+    ]
+    for job in session.query(JobPosition):
+        plans.append((RequirementPlan.from_job(job), RequirementPlan.from_job(job)))
+    return plans
+
+def test_sql_scores_match_in_memory_scores(session, applicants):
+    from backend.app.index import ApplicantIndex
+    from backend.app.plans import applicant_profile
+    from backend.app.sql_scoring import SqlScorer
+    from backend.models.models import Applicant
+
+    index = ApplicantIndex(session)
+    profiles = [applicant_profile(applicant) for applicant in session.query(Applicant).order_by(Applicant.id)]
+    scorer = SqlScorer(session)
+    for plan, sql_plan in _plans(session, index):
+        expected = [(profile.id, plan.score(profile)) for profile in profiles if plan.score(profile) > 30]
+        assert scorer.score(sql_plan) == expected
+
+        scores = index.score_plan(plan)
+        passing = scores > 30
+        assert list(zip(index.ids[passing].tolist(), scores[passing].tolist())) == expected
+
+        # Pages come best first, then by applicant id
+        ranked = sorted(expected, key=lambda pair: (-pair[1], pair[0]))
+        assert scorer.top(sql_plan, limit=10, offset=5) == (ranked[5:15], len(ranked))
+
+def test_ties_round_half_to_even(session, applicants):
+    from backend.app.index import ApplicantIndex
+    from backend.app.plans import RequirementPlan, applicant_profile
+    from backend.app.sql_scoring import SqlCatalog, SqlScorer
+    from backend.models.models import Applicant
+
+    index = ApplicantIndex(session)
+    for requirements, name, expected in ((TIE_UP, "tie-up", 38), (TIE_DOWN, "tie-down", 32)):
+        applicant_id = applicants[name]
+        plan = RequirementPlan.from_requirements(requirements, index)
+        sql_plan = RequirementPlan.from_requirements(requirements, SqlCatalog(session))
+        assert plan.score(applicant_profile(session.get(Applicant, applicant_id))) == expected
+        assert dict(zip(index.ids.tolist(), index.score_plan(plan).tolist()))[applicant_id] == expected
+        assert dict(SqlScorer(session).score(sql_plan))[applicant_id] == expected
+
+def test_sql_salary_points(session, applicants):
+    from backend.app.plans import RequirementPlan, applicant_profile
+    from backend.app.sql_scoring import SqlCatalog, SqlScorer
+    from backend.models.models import Applicant
+
+    requirements = {"requiredSkills": ["Python", "SQL"], "minSalary": 70000, "maxSalary": 140000}
+    plan = RequirementPlan.from_requirements(requirements, SqlCatalog(session))
+    scores = dict(SqlScorer(session).score(plan))
+    for name in ("salary-min", "salary-max", "salary-above", "salary-below", "salary-far-above"):
+        applicant = session.get(Applicant, applicants[name])
+        assert scores.get(applicant.id) == plan.score(applicant_profile(applicant)), name
+    # 30 skill points of 35, plus 5 in range or a share of 5 shrinking with the distance to the range
+    assert scores[applicants["salary-max"]] == 100
+    assert scores[applicants["salary-below"]] == 93
+    assert scores[applicants["salary-far-above"]] == 86
+    assert scores[applicants["salary-above"]] == 99